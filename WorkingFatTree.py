@@ -1,16 +1,15 @@
 from mininet.topo import Topo
 from mininet.net import Mininet
-from mininet.node import Node
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
 from mininet.link import Intf
 from mininet.node import Controller
 from mininet.link import TCLink
-import subprocess
 import sys
 from os import popen
 import threading
 import time
+from teardown import teardown
 
 class POXBridge( Controller ):
     "Custom Controller class to invoke POX forwarding.l2_learning"
@@ -24,16 +23,6 @@ class POXBridge( Controller ):
 
 controllers = { 'poxbridge': POXBridge }
 
-class LinuxRouter( Node ):
-    """Custom Linux router for Layer 3 routing if desired in the network"""
-    def config( self, **params ):
-        super( LinuxRouter, self).config( **params )
-        self.cmd( 'sysctl net.ipv4.ip_forward=1' )
-
-    def terminate( self ):
-        self.cmd( 'sysctl net.ipv4.ip_forward=0' )
-        super( LinuxRouter, self ).terminate()
-
 def runNetwork():
     """
         Author: Brian Lebiednik
@@ -108,8 +97,7 @@ def runNetwork():
 
     #net.pingAll()
     CLI(net)
-    net.stop()
-    subprocess.call(['mn', '-c'])
+    teardown(net)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,117 @@
+"""
+Author: Brian Lebiednik
+
+Hierarchical address plan: 10.<pod>.<edge>.<n> for every host.
+
+A host's edge is the switch it hangs off (an edge router, TOR, or DCell
+server) and its pod is the pod the TopoSpec gives that switch; Topos
+built without a TopoSpec are one pod.  Edges are numbered within their
+pod, hosts within their edge from 1, and the MAC follows the same
+layout, 00:00:0a:<pod>:<edge>:<n>.  So every pod is 10.pod.0.0/16 and
+every edge 10.pod.edge.0/24, in IP and in MAC.
+
+aggregate() turns per host forwarding decisions into as few prefixes as
+possible: a whole pod when all of its hosts are reached the same way,
+else each edge, else each host.  The proactive flows and routed modes
+use it so a switch away from the hosts needs one entry per pod or edge
+however many hosts sit on each edge.
+
+    plan = AddressPlan(topo)
+    plan.apply(topo)            sets the ip and mac of every host
+    net = Mininet(topo=topo, ...)
+    installFlows(net, topo, plan=plan)
+"""
+
+from topostats import topoGraph
+
+LEVELS = ('pod', 'edge', 'host')
+GATEWAY = 254
+
+
+class AddressPlan(object):
+    "Pod, edge and number of every host of a topology"
+
+    def __init__(self, topo):
+        graph = topoGraph(topo)
+        spec = getattr(topo, 'spec', topo if hasattr(topo, 'src') else None)
+        names, offsets, targets = graph.names, graph.offsets, graph.targets
+        self.hosts = {}
+        edges, perPod, perEdge = {}, {}, {}
+        for v, name in enumerate(names):
+            if graph.switch[v] or offsets[v] == offsets[v + 1]:
+                continue
+            edge = targets[offsets[v]]
+            pod = spec.pod[edge] if spec is not None else -1
+            pod = max(pod, 0)
+            if edge not in edges:
+                edges[edge] = (pod, perPod.get(pod, 0))
+                perPod[pod] = perPod.get(pod, 0) + 1
+            pod, number = edges[edge]
+            hosts = perEdge.get(edge, 0) + 1
+            perEdge[edge] = hosts
+            if pod > 255 or number > 255 or hosts >= GATEWAY:
+                raise ValueError('%s: pod %d, edge %d, host %d does not fit '
+                                 'the 10.pod.edge.host plan' %
+                                 (name, pod, number, hosts))
+            self.hosts[name] = (pod, number, hosts)
+
+    def ip(self, name):
+        return '10.%d.%d.%d' % self.hosts[name]
+
+    def mac(self, name):
+        return '00:00:0a:%02x:%02x:%02x' % self.hosts[name]
+
+    def gateway(self, name):
+        "Address of the host's edge router in the routed mode"
+        pod, edge, _n = self.hosts[name]
+        return '10.%d.%d.%d' % (pod, edge, GATEWAY)
+
+    def apply(self, topo):
+        "Set the ip (in 10.0.0.0/8) and mac of every host of topo"
+        for name in self.hosts:
+            info = dict(topo.nodeInfo(name))
+            info.update(ip='%s/8' % self.ip(name), mac=self.mac(name))
+            topo.setNodeInfo(name, info)
+        return topo
+
+    def ipPrefix(self, level, key):
+        "10.pod.0.0/16, 10.pod.edge.0/24 or 10.pod.edge.n/32"
+        key = tuple(key) + (0,) * (3 - len(key))
+        return '10.%d.%d.%d/%d' % (key + (8 + 8 * (LEVELS.index(level) + 1),))
+
+    def macPrefix(self, level, key):
+        "MAC and mask covering a pod, an edge or one host"
+        key = tuple(key) + (0,) * (3 - len(key))
+        mask = ':'.join(['ff'] * (4 + LEVELS.index(level)) +
+                        ['00'] * (2 - LEVELS.index(level)))
+        return '00:00:0a:%02x:%02x:%02x/%s' % (key + (mask,))
+
+    def aggregate(self, actions):
+        """Fewest prefixes with a single action each
+           actions: {host: action}, hosts missing or None are not reached
+           returns: list of (level, key, action), key being (pod,),
+           (pod, edge) or (pod, edge, n); the prefixes do not overlap"""
+        tree = {}
+        for name, (pod, edge, n) in self.hosts.items():
+            tree.setdefault(pod, {}).setdefault(edge, []).append(
+                (n, actions.get(name)))
+        entries = []
+        for pod in sorted(tree):
+            edges = tree[pod]
+            found = set(a for members in edges.values() for _n, a in members)
+            if len(found) == 1:
+                action = found.pop()
+                if action is not None:
+                    entries.append(('pod', (pod,), action))
+                continue
+            for edge in sorted(edges):
+                found = set(a for _n, a in edges[edge])
+                if len(found) == 1:
+                    action = found.pop()
+                    if action is not None:
+                        entries.append(('edge', (pod, edge), action))
+                    continue
+                for n, action in sorted(edges[edge]):
+                    if action is not None:
+                        entries.append(('host', (pod, edge, n), action))
+        return entries
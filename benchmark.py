@@ -0,0 +1,263 @@
+"""
+Author: Brian Lebiednik
+
+Unattended benchmark runner for topology x hosts x pattern x size matrices.
+
+Instead of editing topo, test, run_test and packetsize in perfTest(),
+describe the whole comparison once:
+
+    {"topos": ["FatTreeTopoNoLoop", {"name": "KaryFatTreeTopo", "k": 8}],
+     "hosts": [8, 16],
+     "patterns": ["stride", "bitcomplement"],
+     "packetsizes": [54, 1472],
+     "tests": ["ping", "iperf"],
+     "repetitions": 5, "warmup": 1, "seconds": 10}
+
+Every topology is started once, at its full size.  "hosts" does not
+build smaller networks: a cell with hosts N uses the first N hosts of
+the running topology (h0 to hN-1), and null means all of them; a
+topology with fewer hosts than N skips the cell.  Each cell (hosts,
+pattern, packet size, test) then runs warmup unrecorded repetitions
+followed by the measured ones; iperf cells ignore the packet size.
+Every measured repetition is a run in the ResultStore, and the summary
+gives the mean of each metric over the repetitions with a 95% confidence
+interval (Student t).  A cell that fails is logged and skipped so the
+rest of the night still runs.  With "proactive": true the switches get
+shortest path flows from proactive.py instead of a POX controller, and
+with "multipath": true as well they spread flows over all equal cost
+paths (ECMP).  "routed": true replaces the switches by Linux routers
+instead (routed.py), again with ECMP routes if "multipath" is set.
+"addressPlan": true numbers the hosts 10.pod.edge.n (addrplan.py) so
+those flows and routes cover whole pods and edges.  "staticArp": true
+writes static ARP entries into every host and pre-learns the MACs in the
+switches (staticarp.py), so the first packets of a cell do not wait for
+address resolution.
+
+Usage
+    sudo python benchmark.py matrix.json [summary.txt]
+"""
+
+import json
+import math
+import sys
+from collections import namedtuple
+
+from mininet.log import info, error, setLogLevel
+
+from convergence import waitConverged
+from experiments import pingTest
+from flows import runIperfFlows, flowSummary
+from netoptions import netOptions, buildNet, startNet, connectNet
+import netoptions
+from performancetest import Facebook, FacebookNoLoop, Dcell, DcellNoLoop
+from performancetest import FatTreeTopotest, FatTreeTopoNoLoop, FatTreeTopo
+from results import ResultStore
+from teardown import teardown
+from topofile import SpecTopo
+from topogen import KaryFatTreeTopo, RecursiveDcellTopo, FacebookFabricTopo
+from traffic import topoPairs, uniquePairs
+import scaling_hosts
+
+topologies = {'Facebook': Facebook,
+              'FacebookNoLoop': FacebookNoLoop,
+              'Dcell': Dcell,
+              'DcellNoLoop': DcellNoLoop,
+              'FatTreeTopotest': FatTreeTopotest,
+              'FatTreeTopoNoLoop': FatTreeTopoNoLoop,
+              'FatTreeTopo': FatTreeTopo,
+              'KaryFatTreeTopo': KaryFatTreeTopo,
+              'RecursiveDcellTopo': RecursiveDcellTopo,
+              'FacebookFabricTopo': FacebookFabricTopo,
+              'SpecTopo': SpecTopo,
+              'scaling_hosts.FacebookNoLoop': scaling_hosts.FacebookNoLoop,
+              'scaling_hosts.DcellNoLoop': scaling_hosts.DcellNoLoop,
+              'scaling_hosts.FatTreeTopoNoLoop':
+              scaling_hosts.FatTreeTopoNoLoop}
+
+# The network options of netoptions.py are matrix keys as well
+defaults = dict(netoptions.defaults, hosts=[None], patterns=['stride'],
+                packetsizes=[54], tests=['ping'], repetitions=5, warmup=1,
+                seconds=10, patternArgs={})
+
+CellSummary = namedtuple('CellSummary',
+                         'topo hosts pattern packetsize test metric n mean '
+                         'ci')
+
+# Two sided 95% Student t quantiles for 1..30 degrees of freedom
+T95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262,
+       2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101,
+       2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052,
+       2.048, 2.045, 2.042)
+
+
+def confidence(values):
+    """Mean and half width of its 95% confidence interval
+       (half width None for fewer than two values)"""
+    n = len(values)
+    if not n:
+        return None, None
+    mean = sum(values) / float(n)
+    if n < 2:
+        return mean, None
+    var = sum((v - mean) ** 2 for v in values) / (n - 1)
+    t = T95[n - 2] if n - 1 <= len(T95) else 1.960
+    return mean, t * math.sqrt(var / n)
+
+
+def _topoEntry(entry):
+    "(label, class, params) of a topos entry"
+    if isinstance(entry, dict):
+        params = dict(entry)
+        name = params.pop('name')
+    else:
+        name, params = entry, {}
+    if name not in topologies:
+        raise ValueError('unknown topology %s, try one of %s' %
+                         (name, ', '.join(sorted(topologies))))
+    label = name + ''.join(',%s=%s' % (key, params[key])
+                           for key in sorted(params))
+    return label, topologies[name], params
+
+
+def cells(matrix):
+    "(hosts, pattern, packetsize, test) of every cell for one topology"
+    found = []
+    for test in matrix['tests']:
+        sizes = matrix['packetsizes'] if test == 'ping' else [None]
+        for hosts in matrix['hosts']:
+            for pattern in matrix['patterns']:
+                for size in sizes:
+                    found.append((hosts, pattern, size, test))
+    return found
+
+
+def runCell(net, topo, hosts, pattern, packetsize, test, matrix, run=None):
+    """One repetition of a cell
+       run: Run that keeps the raw output and samples, None for warm up
+       returns: ({metric: value}, PingStats or list of FlowResult)"""
+    host = dict((i, net.get('h%d' % i)) for i in range(hosts))
+    pairs = topoPairs(pattern, topo, hosts, **matrix['patternArgs'])
+    seconds = matrix['seconds']
+    if test == 'ping':
+        if run is None:
+            stats = pingTest(host, pairs, packetsize, seconds)
+        else:
+            stats = pingTest(host, pairs, packetsize, seconds,
+                             outdir=run.dir, sink=run.addPing)
+        total = stats.total()
+        return {'rtt_ms': total.mean, 'rtt_p99_ms': total.percentile(99),
+                'loss': total.loss()}, stats
+    if test == 'iperf':
+        results = runIperfFlows(host, uniquePairs(pairs), seconds=seconds)
+        summary = flowSummary(results)
+        return {'total_mbps': summary['totalMbps'],
+                'mean_mbps': summary['meanMbps'],
+                'failed_flows': summary['failed']}, results
+    raise ValueError('unknown test %s, use ping or iperf' % test)
+
+
+def runTopology(entry, matrix, store):
+    "Start one topology, run all of its cells, tear it down"
+    label, cls, params = _topoEntry(entry)
+    info('*** Benchmarking %s\n' % label)
+    topo = cls(**params)
+    options = netOptions(matrix)
+    net, plan = buildNet(topo, options)
+    summaries = []
+    try:
+        startNet(net, topo, options, plan)
+        connectNet(net, topo, options, plan)
+        converged = waitConverged(net, topo)
+        available = len(topo.hosts())
+        for hosts, pattern, size, test in cells(matrix):
+            count = available if hosts is None else hosts
+            if count > available:
+                error('*** %s has %d hosts, skipping %d\n' %
+                      (label, available, count))
+                continue
+            try:
+                summaries += _repeat(net, topo, label, count, pattern, size,
+                                     test, matrix, store, converged)
+            except Exception as e:
+                error('*** %s %s %s %s failed: %s\n' %
+                      (label, count, pattern, test, e))
+    finally:
+        teardown(net)
+    return summaries
+
+
+def _repeat(net, topo, label, hosts, pattern, size, test, matrix, store,
+            converged):
+    "Warm up, then measure a cell repetitions times"
+    for _i in range(matrix['warmup']):
+        runCell(net, topo, hosts, pattern, size, test, matrix)
+    values = {}
+    for rep in range(matrix['repetitions']):
+        run = store.newRun(label, hosts=hosts, packetsize=size, kind=test,
+                           pattern=pattern, repetition=rep,
+                           benchmark=True)
+        try:
+            metrics, raw = runCell(net, topo, hosts, pattern, size, test,
+                                   matrix, run)
+            if test == 'iperf':
+                run.addFlows(raw)
+            for metric, value in metrics.items():
+                if value is not None:
+                    values.setdefault(metric, []).append(value)
+                    run.add('-', '-', metric, value)
+            run.add('-', '-', 'convergence_s', converged['seconds'])
+        finally:
+            run.close()
+    summaries = []
+    for metric in sorted(values):
+        mean, ci = confidence(values[metric])
+        summaries.append(CellSummary(label, hosts, pattern, size, test,
+                                     metric, len(values[metric]), mean, ci))
+        info('*** %s hosts=%d %s %s %s: %.3f +- %s\n' %
+             (label, hosts, pattern, size or '-', metric, mean,
+              '-' if ci is None else '%.3f' % ci))
+    return summaries
+
+
+def runMatrix(matrix, store=None):
+    """Run every cell of every topology in matrix (see the module doc)
+       returns: list of CellSummary"""
+    unknown = set(matrix) - set(defaults) - set(['topos'])
+    if unknown:
+        raise ValueError('unknown matrix keys: %s' %
+                         ', '.join(sorted(unknown)))
+    full = dict(defaults)
+    full.update(matrix)
+    if store is None:
+        store = ResultStore()
+    summaries = []
+    for entry in full['topos']:
+        try:
+            summaries += runTopology(entry, full, store)
+        except Exception as e:
+            error('*** topology %s failed: %s\n' % (entry, e))
+    return summaries
+
+
+def writeSummary(summaries, filename):
+    "One row per cell and metric: mean and 95% confidence half width"
+    with open(filename, 'w') as f:
+        f.write('topo\thosts\tpattern\tpacketsize\ttest\tmetric\tn\tmean'
+                '\tci95\n')
+        for s in summaries:
+            f.write('%s\t%d\t%s\t%s\t%s\t%s\t%d\t%.6f\t%s\n' %
+                    (s.topo, s.hosts, s.pattern,
+                     '-' if s.packetsize is None else s.packetsize,
+                     s.test, s.metric, s.n, s.mean,
+                     '-' if s.ci is None else '%.6f' % s.ci))
+
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    if len(sys.argv) < 2:
+        sys.exit('usage: benchmark.py matrix.json [summary.txt]')
+    with open(sys.argv[1]) as f:
+        matrix = json.load(f)
+    summaries = runMatrix(matrix)
+    writeSummary(summaries, sys.argv[2] if len(sys.argv) > 2
+                 else 'benchmark.txt')
@@ -0,0 +1,109 @@
+"""
+Author: Brian Lebiednik
+
+Convergence probe that replaces net.pingAll().
+
+pingAll() pings every ordered host pair one after the other, about 261k
+pings at 512 hosts.  waitConverged() only probes a spanning set of
+pairs: one representative host per edge switch (or per pod), joined in
+a ring so every representative both sends and answers.  All pending
+probes of a round run in parallel and the probe returns as soon as all
+of them have answered.
+"""
+
+import re
+from subprocess import PIPE, STDOUT
+from time import time, sleep
+
+from mininet.log import info
+
+
+def _order(name):
+    "Sort key that puts h2 before h10"
+    return [int(part) if part.isdigit() else part
+            for part in re.split(r'(\d+)', name)]
+
+
+def hostSwitch(host):
+    "Switch (or other node) at the far end of the first link of host"
+    for intf in host.intfList():
+        link = intf.link
+        if link:
+            return link.intf2.node if link.intf1 is intf else link.intf1.node
+    return None
+
+
+def representatives(net, topo=None, mode='edge'):
+    """One host for every edge switch ('edge') or for every pod ('pod',
+       using the pods of a topology built from a TopoSpec)"""
+    spec = getattr(topo, 'spec', None)
+    if mode == 'pod' and spec is not None:
+        pods = dict((name, spec.pod[i]) for i, name in enumerate(spec.names))
+
+        def group(host):
+            return pods.get(host.name)
+    else:
+        def group(host):
+            switch = hostSwitch(host)
+            return switch.name if switch else host.name
+    reps = {}
+    for host in sorted(net.hosts, key=lambda h: _order(h.name)):
+        reps.setdefault(group(host), host)
+    return sorted(reps.values(), key=lambda h: _order(h.name))
+
+
+def probePairs(reps):
+    "Ring of representatives: each one pings the next"
+    if len(reps) < 2:
+        return []
+    return [(reps[i], reps[(i + 1) % len(reps)]) for i in range(len(reps))]
+
+
+def _probe(pairs, batch):
+    "Ping every pair once in parallel; returns the pairs that answered"
+    answered = []
+    for start in range(0, len(pairs), batch):
+        running = [(pair, pair[0].popen(['ping', '-c1', '-W1',
+                                         pair[1].IP()],
+                                        stdout=PIPE, stderr=STDOUT))
+                   for pair in pairs[start:start + batch]]
+        for pair, ping in running:
+            ping.communicate()
+            if ping.returncode == 0:
+                answered.append(pair)
+    return answered
+
+
+def waitConverged(net, topo=None, mode='edge', timeout=60, interval=0.5,
+                  batch=256):
+    """Wait until every probe pair answers
+       net: started Mininet
+       topo: topology, used for the pods when mode='pod'
+       mode: 'edge' or 'pod', see representatives()
+       timeout: give up after this many seconds
+       batch: most pings running at the same time
+       returns: report dict with converged, seconds, rounds, pairs and
+       the pairs still failing"""
+    start = time()
+    pending = probePairs(representatives(net, topo, mode))
+    total = len(pending)
+    info('*** Probing %d paths for convergence\n' % total)
+    rounds = 0
+    while pending:
+        rounds += 1
+        answered = set(_probe(pending, batch))
+        pending = [pair for pair in pending if pair not in answered]
+        if not pending or time() - start > timeout:
+            break
+        sleep(interval)
+    seconds = time() - start
+    report = {'converged': not pending,
+              'seconds': seconds,
+              'rounds': rounds,
+              'pairs': total,
+              'failed': ['%s->%s' % (src.name, dst.name)
+                         for src, dst in pending]}
+    info('*** %s after %.2f s, %d rounds, %d/%d paths answering\n' %
+         ('Converged' if not pending else 'Not converged', seconds, rounds,
+          total - len(pending), total))
+    return report
@@ -0,0 +1,57 @@
+"""
+Author: Brian Lebiednik
+
+Test drivers shared by performancetest.py and scaling_hosts.py.
+
+hosts is the host table the scripts build, mapping index i to the
+mininet host 'h<i>', and pairs are (src, dst) indexes from traffic.py.
+"""
+
+import tempfile
+from time import time
+
+from mininet.log import info
+
+from monitor import monitorFiles
+from pingstats import PingStats, pingRecords
+from shells import cmdAll, cmdLines
+
+
+def pingTest(hosts, pairs, packetsize, seconds, outdir=None, sink=None):
+    """Ping dst from src for every pair and summarize the replies seen
+       during seconds
+       outdir: directory for the raw ping output, by default a new
+       temporary directory so runs do not overwrite each other
+       sink: optional callable that also gets every PingRecord, with the
+       dst IP replaced by the host name (e.g. Run.addPing)
+       returns: PingStats"""
+    if outdir is None:
+        outdir = tempfile.mkdtemp(prefix='pingtest-')
+    info('Ping output in %s\n' % outdir)
+    outfiles, errfiles = {}, {}
+    starts = {}
+    for src, dst in pairs:
+        key = (hosts[src], hosts[dst])
+        name = '%s-%s' % (hosts[src].name, hosts[dst].name)
+        # The redirections create and/or erase the output files
+        outfiles[key] = '%s/%s.out' % (outdir, name)
+        errfiles[key] = '%s/%s.err' % (outdir, name)
+        starts.setdefault(hosts[src], []).append(
+            'ping -O %s -s %s > %s 2> %s &' %
+            (hosts[dst].IP(), packetsize, outfiles[key], errfiles[key]))
+    # Start the pings of every source with as few lines as fit the shell,
+    # all shells at once
+    start = time()
+    cmdLines(starts)
+    info('Started %d pings on %d hosts in %.3f s\n' %
+         (len(outfiles), len(starts), time() - start))
+    info('Monitoring output for %s seconds\n' % seconds)
+    names = dict((h.IP(), h.name) for h in hosts.values())
+    stats = PingStats(names)
+    for record in pingRecords(monitorFiles(outfiles, seconds, timeoutms=500)):
+        stats.add(record)
+        if sink is not None:
+            sink(record._replace(dst=names.get(record.dst, record.dst)))
+    # Stop only the pings this shell started
+    cmdAll(dict((src, 'pkill -P $$ ping') for src in starts))
+    return stats
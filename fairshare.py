@@ -0,0 +1,228 @@
+"""
+Author: Brian Lebiednik
+
+Max-min fair throughput predictor.
+
+A fluid model of the iperf tests: every flow is routed over the
+topology, every link direction has the capacity of its bw= option
+(links without bw are not limited), and the rates are found by
+progressive water filling: all flows grow together until some link is
+full, the flows crossing it are frozen at that rate, and the rest keep
+growing.  Comparing the prediction with the measured iperf rates shows
+whether a result is limited by the topology or by the emulation.
+
+Routing
+    single  one shortest path per flow: at every switch the first next
+            hop in CSR order, i.e. in the order the Topo lists the links
+    ecmp    traffic split evenly over all shortest next hops at every
+            switch, as hashing over many flows would
+
+Usage
+    predicted = predictRates(topo, host, pairs, routing='ecmp')
+    rows = compareFlows(predicted, runIperfFlows(host, pairs))
+"""
+
+from collections import namedtuple
+
+from topostats import topoGraph
+
+FlowPrediction = namedtuple('FlowPrediction', 'src dst mbps bottleneck')
+FlowComparison = namedtuple('FlowComparison',
+                            'src dst predicted measured ratio limit')
+
+INF = float('inf')
+
+
+def linkCapacities(topo):
+    "bw option (Mbit/s) of every link in topoGraph() order, None if unset"
+    spec = getattr(topo, 'spec', topo if hasattr(topo, 'src') else None)
+    if spec is not None:
+        return [spec.linkOpts[c].get('bw') for c in spec.cls]
+    return [info.get('bw') for _a, _b, info in topo.links(withInfo=True)]
+
+
+def hopsTo(graph, dst):
+    "Hops from every node to dst; only switches (and dst) forward"
+    dist = [-1] * len(graph.names)
+    dist[dst] = 0
+    frontier = [dst]
+    offsets, targets, switch = graph.offsets, graph.targets, graph.switch
+    while frontier:
+        nxt = []
+        for v in frontier:
+            if v != dst and not switch[v]:
+                continue
+            for e in range(offsets[v], offsets[v + 1]):
+                w = targets[e]
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    nxt.append(w)
+        frontier = nxt
+    return dist
+
+
+def nextHops(graph, dist, v, dst):
+    """CSR entries of v that lead one hop closer to dst (dist from
+       hopsTo()), in CSR order; the first one is the 'single' path"""
+    offsets, targets, switch = graph.offsets, graph.targets, graph.switch
+    hop = dist[v]
+    return [e for e in range(offsets[v], offsets[v + 1])
+            if dist[targets[e]] == hop - 1 and
+            (targets[e] == dst or switch[targets[e]])]
+
+
+def _route(graph, dist, src, dst, routing):
+    """Fraction of the flow src -> dst on each link direction
+       returns: {2 * link + direction: fraction}, direction 0 when the
+       link is crossed from its first node to its second"""
+    targets, linkIds = graph.targets, graph.linkIds
+    links, switch = graph.links, graph.switch
+    if dist[src] < 0:
+        return None
+    share = {src: 1.0}
+    usage = {}
+    for hop in range(dist[src], 0, -1):
+        nextShare = {}
+        for v in sorted(share):
+            if v != src and not switch[v]:
+                continue
+            down = nextHops(graph, dist, v, dst)
+            if routing == 'single':
+                down = down[:1]
+            part = share[v] / len(down)
+            for e in down:
+                w, link = targets[e], linkIds[e]
+                key = 2 * link + (0 if links[link][0] == v else 1)
+                usage[key] = usage.get(key, 0.0) + part
+                nextShare[w] = nextShare.get(w, 0.0) + part
+        share = nextShare
+    return usage
+
+
+def waterFill(usages, capacity):
+    """Max-min fair rates by progressive filling
+       usages: per flow {resource: fraction of the flow's rate}, or None
+       for a flow that cannot be routed
+       capacity: map of resource to capacity; missing means unlimited
+       returns: (rates, bottleneck resource of every flow)"""
+    count = len(usages)
+    rates = [0.0] * count
+    bottleneck = [None] * count
+    users = {}
+    for f, usage in enumerate(usages):
+        for r, fraction in (usage or {}).items():
+            if capacity.get(r) is not None:
+                users.setdefault(r, []).append((f, fraction))
+    active = set(f for f in range(count) if usages[f])
+    # Flows limited by no link at all would grow forever
+    unlimited = set(f for f in active
+                    if not any(r in users for r in usages[f]))
+    for f in unlimited:
+        rates[f] = INF
+    active -= unlimited
+    left = dict((r, float(capacity[r])) for r in users)
+    # Sum of the fractions of the still growing flows on each resource
+    demand = dict((r, sum(fraction for _f, fraction in flows))
+                  for r, flows in users.items())
+    for f in unlimited:
+        for r, fraction in usages[f].items():
+            if r in demand:
+                demand[r] -= fraction
+    while active:
+        step, full = INF, []
+        for r, need in demand.items():
+            if need <= 1e-12:
+                continue
+            room = left[r] / need
+            if room < step - 1e-12:
+                step, full = room, [r]
+            elif room <= step + 1e-12:
+                full.append(r)
+        if step == INF:
+            break
+        for r, need in demand.items():
+            left[r] -= step * need
+        for f in active:
+            rates[f] += step
+        for r in full:
+            for f, _fraction in users[r]:
+                if f in active:
+                    active.discard(f)
+                    bottleneck[f] = r
+                    for q, fraction in usages[f].items():
+                        if q in demand:
+                            demand[q] -= fraction
+    return rates, bottleneck
+
+
+def predictRates(topo, hosts, pairs, routing='ecmp'):
+    """Max-min fair rate of every flow
+       topo: Topo or TopoSpec carrying the bw= link options
+       hosts: map of index to host (or host name), as given to
+       runIperfFlows()
+       pairs: (src, dst) host indexes
+       routing: 'single' or 'ecmp'
+       returns: list of FlowPrediction, mbps 0 for unroutable flows and
+       bottleneck 'node1->node2' or None"""
+    if routing not in ('single', 'ecmp'):
+        raise ValueError('routing must be single or ecmp, not %s' % routing)
+    graph = topoGraph(topo)
+    index = dict((name, i) for i, name in enumerate(graph.names))
+    capacity = {}
+    for link, bw in enumerate(linkCapacities(topo)):
+        capacity[2 * link] = capacity[2 * link + 1] = bw
+    names = [(str(hosts[src]), str(hosts[dst])) for src, dst in pairs]
+    distances = {}
+    usages = []
+    for src, dst in names:
+        d = index[dst]
+        if d not in distances:
+            distances[d] = hopsTo(graph, d)
+        usages.append(_route(graph, distances[d], index[src], d, routing))
+    rates, bottleneck = waterFill(usages, capacity)
+    predictions = []
+    for (src, dst), rate, r in zip(names, rates, bottleneck):
+        where = None
+        if r is not None:
+            a, b = graph.links[r // 2]
+            if r % 2:
+                a, b = b, a
+            where = '%s->%s' % (graph.names[a], graph.names[b])
+        predictions.append(FlowPrediction(src, dst, rate, where))
+    return predictions
+
+
+def compareFlows(predictions, results, tolerance=0.1):
+    """Match measured FlowResults to predictions by (src, dst)
+       limit is 'topology' when the flow got within tolerance of its
+       fair share, 'emulation' when it fell short of it and 'failed' for
+       flows without a measurement"""
+    measured = {}
+    for r in results:
+        measured.setdefault((r.src, r.dst), []).append(r.bps)
+    rows = []
+    for p in predictions:
+        runs = measured.get((p.src, p.dst), [])
+        bps = runs.pop(0) if runs else None
+        if bps is None:
+            rows.append(FlowComparison(p.src, p.dst, p.mbps, None, None,
+                                       'failed'))
+            continue
+        mbps = bps / 1e6
+        ratio = mbps / p.mbps if 0 < p.mbps < INF else None
+        limit = 'topology' if ratio is None or ratio >= 1 - tolerance \
+            else 'emulation'
+        rows.append(FlowComparison(p.src, p.dst, p.mbps, mbps, ratio, limit))
+    return rows
+
+
+def writeComparison(rows, filename):
+    "One row per flow: predicted and measured Mbit/s, ratio and limit"
+    def number(value):
+        return '-' if value is None else '%.3f' % value
+    with open(filename, 'w') as f:
+        f.write('src\tdst\tpredicted\tmeasured\tratio\tlimit\n')
+        for row in rows:
+            f.write('%s\t%s\t%s\t%s\t%s\t%s\n' %
+                    (row.src, row.dst, number(row.predicted),
+                     number(row.measured), number(row.ratio), row.limit))
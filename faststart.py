@@ -0,0 +1,262 @@
+"""
+Author: Brian Lebiednik
+
+Fast network start with batched link creation and shaping.
+
+With link=TCLink every link costs a shell round trip to create its veth
+pair and several more for ifconfig, ethtool and every tc command on both
+of its interfaces, so net.start() of a 500+ link topology takes minutes.
+FastMininet records those commands instead of running them while the
+network is built and then replays them in bulk:
+
+    veth   one 'ip -batch' in the root namespace creates every veth pair
+           directly inside the namespaces of its two nodes
+    config per namespace, one 'ip -batch' (link up, MAC, addresses), one
+           shell script (ethtool) and one 'tc -batch' (tbf/netem qdiscs),
+           sent to all hosts at once and then collected
+
+startupTimes breaks the start up into phases so the gain per phase is
+visible.
+
+Usage
+    net = FastMininet(topo=topo, controller=RemoteController)
+    net.start()
+    print net.startupReport()
+"""
+
+import os
+import shutil
+import tempfile
+from functools import partial
+from time import time
+
+from mininet.link import Link, TCIntf
+from mininet.log import info, error
+from mininet.net import Mininet
+from mininet.util import quietRun
+
+
+class StartupBatch(object):
+    "Link commands recorded per namespace while the network is built"
+
+    def __init__(self):
+        self.recording = False
+        self.pairs = []
+        # Interfaces the batch creates, which start without a root qdisc
+        self.created = set()
+        # node (None for the root namespace) -> lists of commands
+        self.ipCmds, self.tcCmds, self.shCmds = {}, {}, {}
+
+    def addPair(self, intf1, intf2, addr1, addr2, node1, node2):
+        "Remember a veth pair to create"
+        self.pairs.append((intf1, intf2, addr1, addr2, node1, node2))
+        self.created.update((intf1, intf2))
+
+    @staticmethod
+    def _key(node):
+        return node if node is not None and node.inNamespace else None
+
+    def record(self, node, cmd):
+        """Remember an interface command; returns '' like a quiet success,
+           or for 'tc qdisc show' the default qdisc of a new veth"""
+        key = self._key(node)
+        words = cmd.split()
+        if words[0] == 'tc':
+            if words[1:3] == ['qdisc', 'show']:
+                return 'qdisc noqueue 0: dev %s root refcnt 2\n' % words[-1]
+            # TCIntf clears the root qdisc first, which a veth this batch
+            # creates does not have; tc would fail in every namespace
+            if (words[1:4] == ['qdisc', 'del', 'dev'] and
+                    words[5:] == ['root'] and words[4] in self.created):
+                return ''
+            self.tcCmds.setdefault(key, []).append(' '.join(words[1:]))
+            return ''
+        ipCmds = self._ifconfig(words)
+        if ipCmds is None:
+            self.shCmds.setdefault(key, []).append(cmd)
+        else:
+            self.ipCmds.setdefault(key, []).extend(ipCmds)
+        return ''
+
+    @staticmethod
+    def _ifconfig(words):
+        "ip -batch lines for the ifconfig forms mininet uses, else None"
+        if words[0] != 'ifconfig' or len(words) < 3:
+            return None
+        name, args = words[1], words[2:]
+        if args in (['up'], ['down']):
+            return ['link set dev %s %s' % (name, args[0])]
+        if len(args) == 3 and args[:2] == ['hw', 'ether']:
+            return ['link set dev %s address %s' % (name, args[2])]
+        if len(args) == 2 and args[1] == 'up' and '/' in args[0]:
+            return ['addr replace %s brd + dev %s' % (args[0], name),
+                    'link set dev %s up' % name]
+        return None
+
+    def vethLines(self):
+        lines = []
+        for intf1, intf2, addr1, addr2, node1, node2 in self.pairs:
+            side1 = 'name %s' % intf1
+            side2 = 'name %s' % intf2
+            if addr1 and addr2:
+                side1 += ' address %s' % addr1
+                side2 += ' address %s' % addr2
+            if self._key(node1):
+                side1 += ' netns %d' % node1.pid
+            if self._key(node2):
+                side2 += ' netns %d' % node2.pid
+            lines.append('link add %s type veth peer %s' % (side1, side2))
+        return lines
+
+    def flushVeth(self, tmpdir):
+        "Create every recorded veth pair with one ip -batch"
+        if not self.pairs:
+            return
+        path = os.path.join(tmpdir, 'veth')
+        with open(path, 'w') as f:
+            f.write('\n'.join(self.vethLines()) + '\n')
+        output = quietRun('ip -force -batch %s' % path)
+        if output.strip():
+            error('*** veth batch: %s\n' % output.strip())
+        self.pairs = []
+
+    def script(self, key, tmpdir):
+        "Shell command that replays everything recorded for key"
+        name = key.name if key is not None else 'root'
+        parts = []
+        for kind, cmds, runner in (('ip', self.ipCmds, 'ip -force -batch'),
+                                   ('sh', self.shCmds, 'sh'),
+                                   ('tc', self.tcCmds, 'tc -force -batch')):
+            lines = cmds.get(key)
+            if lines:
+                path = os.path.join(tmpdir, '%s.%s' % (name, kind))
+                with open(path, 'w') as f:
+                    f.write('\n'.join(lines) + '\n')
+                parts.append('%s %s' % (runner, path))
+        return ' ; '.join(parts)
+
+    def flushConfig(self, tmpdir):
+        "Replay the interface commands, one batch set per namespace"
+        keys = set(self.ipCmds) | set(self.tcCmds) | set(self.shCmds)
+        sent = []
+        for key in keys:
+            cmd = self.script(key, tmpdir)
+            if not cmd:
+                continue
+            if key is None:
+                output = quietRun(cmd, shell=True)
+                if output.strip():
+                    error('*** root namespace batch: %s\n' % output.strip())
+            else:
+                # Start every host first, then collect the outputs
+                key.sendCmd(cmd)
+                sent.append(key)
+        for node in sent:
+            output = node.waitOutput()
+            if output.strip():
+                error('*** %s batch: %s\n' % (node.name, output.strip()))
+        self.ipCmds, self.tcCmds, self.shCmds = {}, {}, {}
+        self.created = set()
+
+
+class BatchTCIntf(TCIntf):
+    "TCIntf whose commands go to a StartupBatch while it is recording"
+
+    def __init__(self, name, batch=None, **params):
+        self.batch = batch
+        TCIntf.__init__(self, name, **params)
+
+    def cmd(self, *args, **kwargs):
+        if self.batch is not None and self.batch.recording:
+            return self.batch.record(self.node,
+                                     ' '.join(str(arg) for arg in args))
+        return TCIntf.cmd(self, *args, **kwargs)
+
+
+class BatchTCLink(Link):
+    "TCLink whose veth pair and shaping are created by a StartupBatch"
+
+    def __init__(self, node1, node2, port1=None, port2=None,
+                 intfName1=None, intfName2=None, addr1=None, addr2=None,
+                 batch=None, **params):
+        self.batch = batch
+        params1 = dict(params, batch=batch)
+        params2 = dict(params, batch=batch)
+        Link.__init__(self, node1, node2, port1=port1, port2=port2,
+                      intfName1=intfName1, intfName2=intfName2,
+                      cls1=BatchTCIntf, cls2=BatchTCIntf,
+                      addr1=addr1, addr2=addr2,
+                      params1=params1, params2=params2)
+
+    def makeIntfPair(self, intfname1, intfname2, addr1=None, addr2=None,
+                     node1=None, node2=None, deleteIntfs=True):
+        if self.batch is not None and self.batch.recording:
+            self.batch.addPair(intfname1, intfname2, addr1, addr2,
+                               node1, node2)
+            return ''
+        return Link.makeIntfPair(intfname1, intfname2, addr1, addr2,
+                                 node1, node2, deleteIntfs=deleteIntfs)
+
+
+class FastMininet(Mininet):
+    """Mininet that builds links in batches and times every start phase.
+       Links are always BatchTCLink; links without bw/delay/loss are
+       simply not shaped."""
+
+    phases = ('hosts', 'switches', 'controllers', 'links', 'veth',
+              'config', 'configHosts', 'start')
+
+    def __init__(self, *args, **kwargs):
+        self.batch = StartupBatch()
+        self.startupTimes = dict((phase, 0.0) for phase in self.phases)
+        kwargs['link'] = partial(BatchTCLink, batch=self.batch)
+        Mininet.__init__(self, *args, **kwargs)
+
+    def _timed(self, phase, method, *args, **kwargs):
+        start = time()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.startupTimes[phase] += time() - start
+
+    def addHost(self, *args, **kwargs):
+        return self._timed('hosts', Mininet.addHost, *args, **kwargs)
+
+    def addSwitch(self, *args, **kwargs):
+        return self._timed('switches', Mininet.addSwitch, *args, **kwargs)
+
+    def addController(self, *args, **kwargs):
+        return self._timed('controllers', Mininet.addController,
+                           *args, **kwargs)
+
+    def addLink(self, *args, **kwargs):
+        return self._timed('links', Mininet.addLink, *args, **kwargs)
+
+    def configHosts(self):
+        return self._timed('configHosts', Mininet.configHosts)
+
+    def start(self):
+        return self._timed('start', Mininet.start)
+
+    def buildFromTopo(self, topo=None):
+        "Build the nodes and links, then create and configure links in bulk"
+        tmpdir = tempfile.mkdtemp(prefix='faststart-')
+        self.batch.recording = True
+        try:
+            Mininet.buildFromTopo(self, topo)
+        finally:
+            self.batch.recording = False
+        try:
+            info('*** Creating %d veth pairs in one batch\n' %
+                 len(self.batch.pairs))
+            self._timed('veth', lambda net: self.batch.flushVeth(tmpdir))
+            info('*** Configuring links in batches\n')
+            self._timed('config', lambda net: self.batch.flushConfig(tmpdir))
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def startupReport(self):
+        "One line per phase with its time in seconds"
+        return '\n'.join('%-12s %8.3f' % (phase, self.startupTimes[phase])
+                         for phase in self.phases) + \
+            '\n%-12s %8.3f' % ('total', sum(self.startupTimes.values()))
@@ -0,0 +1,223 @@
+"""
+Author: Brian Lebiednik
+
+Concurrent iperf flow scheduler.
+
+net.iperf() runs one flow at a time and starts with 'killall -9 iperf',
+so calling it from several threads killed the other flows, and the
+bandwidth it returned was thrown away.  runIperfFlows() starts one
+iperf server per flow on its own port, each writing to its own file,
+and follows all of those files at once until every server is listening.
+Then a bounded pool of worker threads waits on a start barrier and
+launches every client at the same moment.  The pool is joined with a
+timeout and each flow is returned as a FlowResult with its measured
+throughput, or with the error 'timeout' if it had none by then.
+
+Usage
+    results = runIperfFlows(host, pairs, seconds=5)
+    writeFlows(results, 'iperf.txt')
+"""
+
+import tempfile
+import threading
+from collections import namedtuple
+from subprocess import PIPE, STDOUT
+from time import time
+
+from mininet.log import info, error
+
+from monitor import FileFollower
+
+FlowResult = namedtuple('FlowResult', 'src dst port bps start end error')
+
+
+class StartBarrier(object):
+    "Let count threads through together once all of them have arrived"
+
+    def __init__(self, count):
+        self.count = count
+        self.arrived = 0
+        self.cond = threading.Condition()
+
+    def wait(self, timeout=None):
+        "returns: False if the other threads did not arrive in time"
+        with self.cond:
+            self.arrived += 1
+            if self.arrived >= self.count:
+                self.cond.notify_all()
+                return True
+            deadline = None if timeout is None else time() + timeout
+            while self.arrived < self.count:
+                remaining = None if deadline is None else deadline - time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            return True
+
+
+def _waitListening(outfiles, timeout):
+    """Follow the output files of the iperf servers until all of them
+       say they are listening
+       outfiles: {port: output file of its server}
+       returns: set of the ports whose server did not start in time"""
+    waiting = set(outfiles)
+    follower = FileFollower(outfiles)
+    try:
+        lines = follower.readAll()
+        deadline = time() + timeout
+        while True:
+            waiting.difference_update(port for port, line in lines
+                                      if 'listening' in line)
+            remaining = deadline - time()
+            if not waiting or remaining <= 0:
+                return waiting
+            lines = follower.wait(remaining)
+    finally:
+        follower.close()
+
+
+def _parseClient(output):
+    "Bits per second from 'iperf -y C' client output, or None"
+    for line in reversed(output.decode('utf-8', 'replace').splitlines()):
+        fields = line.strip().split(',')
+        if len(fields) >= 9:
+            try:
+                return float(fields[8])
+            except ValueError:
+                pass
+    return None
+
+
+class _Worker(threading.Thread):
+    """Run a share of the flows once every worker is at the barrier
+       Every flow is pending from the start; stop() reports the ones
+       still without a result as timed out"""
+
+    def __init__(self, flows, barrier, seconds):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.flows = flows
+        self.barrier = barrier
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.clients = {}
+        self.results = []
+
+    def run(self):
+        self.barrier.wait()
+        for src, dst, port in self.flows:
+            with self.lock:
+                if self.stopped:
+                    return
+                self.clients[port] = (
+                    src.popen(['iperf', '-c', dst.IP(), '-p', str(port),
+                               '-t', str(self.seconds), '-y', 'C'],
+                              stdout=PIPE, stderr=STDOUT), time())
+        for src, dst, port in self.flows:
+            client, start = self.clients[port]
+            output, _err = client.communicate()
+            bps = _parseClient(output)
+            problem = None if bps is not None else \
+                output.decode('utf-8', 'replace').strip() or 'no output'
+            with self.lock:
+                if self.stopped:
+                    return
+                self.results.append(FlowResult(src.name, dst.name, port,
+                                               bps, start, time(), problem))
+
+    def stop(self):
+        """Launch no more clients and kill the ones still running
+           returns: the results, with a 'timeout' FlowResult for every
+           flow that has none"""
+        with self.lock:
+            self.stopped = True
+            results = list(self.results)
+            done = set(r.port for r in results)
+            now = time()
+            for src, dst, port in self.flows:
+                if port in done:
+                    continue
+                client, start = self.clients.get(port, (None, now))
+                if client is not None:
+                    client.kill()
+                results.append(FlowResult(src.name, dst.name, port, None,
+                                          start, now, 'timeout'))
+        return results
+
+
+def runIperfFlows(hosts, pairs, seconds=5, workers=32, timeout=None,
+                  basePort=5001, outdir=None):
+    """Run one TCP iperf flow per (src, dst) pair, all at the same time
+       hosts: map of index to mininet host
+       pairs: (src, dst) host indexes, e.g. from traffic.py
+       seconds: length of every flow
+       workers: size of the thread pool that launches and reaps clients
+       timeout: give up on flows still running after this many seconds
+       outdir: directory for the iperf server output, by default a new
+       temporary directory
+       returns: list of FlowResult, bps None for failed flows"""
+    if timeout is None:
+        timeout = seconds + 15
+    if outdir is None:
+        outdir = tempfile.mkdtemp(prefix='iperf-')
+    flows = [(hosts[src], hosts[dst], basePort + i)
+             for i, (src, dst) in enumerate(pairs)]
+    servers, outfiles = [], {}
+    for _src, dst, port in flows:
+        outfiles[port] = '%s/%s-%d.out' % (outdir, dst.name, port)
+        with open(outfiles[port], 'w') as out:
+            servers.append(dst.popen(['iperf', '-s', '-p', str(port)],
+                                     stdout=out, stderr=STDOUT))
+    for port in sorted(_waitListening(outfiles, 5)):
+        error('iperf server on port %d did not start, see %s\n' %
+              (port, outfiles[port]))
+
+    count = max(1, min(workers, len(flows)))
+    barrier = StartBarrier(count)
+    pool = [_Worker(flows[i::count], barrier, seconds) for i in range(count)]
+    info('*** Starting %d iperf flows with %d workers\n' %
+         (len(flows), count))
+    for worker in pool:
+        worker.start()
+    deadline = time() + timeout
+    for worker in pool:
+        worker.join(max(0, deadline - time()))
+
+    results = []
+    for worker in pool:
+        results.extend(worker.stop())
+    for server in servers:
+        server.kill()
+        server.wait()
+    results.sort(key=lambda r: r.port)
+    return results
+
+
+def flowSummary(results):
+    """Aggregate numbers for a set of concurrent flows
+       returns: dict with total and mean Mbit/s, failures and the spread
+       of the start times, which shows how concurrent the flows were"""
+    ok = [r for r in results if r.bps is not None]
+    starts = [r.start for r in results]
+    total = sum(r.bps for r in ok) / 1e6
+    return {'flows': len(results),
+            'failed': len(results) - len(ok),
+            'totalMbps': total,
+            'meanMbps': total / len(ok) if ok else 0.0,
+            'minMbps': min(r.bps for r in ok) / 1e6 if ok else 0.0,
+            'startSpread': max(starts) - min(starts) if starts else 0.0}
+
+
+def writeFlows(results, filename):
+    "Write one row per flow followed by the summary"
+    with open(filename, 'w') as f:
+        f.write('src\tdst\tport\tMbps\tstart\tend\terror\n')
+        for r in results:
+            f.write('%s\t%s\t%d\t%s\t%.3f\t%.3f\t%s\n' %
+                    (r.src, r.dst, r.port,
+                     '-' if r.bps is None else '%.3f' % (r.bps / 1e6),
+                     r.start, r.end, r.error or ''))
+        summary = flowSummary(results)
+        f.write('# ' + ' '.join('%s=%s' % (key, summary[key])
+                                for key in sorted(summary)) + '\n')
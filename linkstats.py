@@ -0,0 +1,195 @@
+"""
+Author: Brian Lebiednik
+
+Per link utilization sampler.
+
+Switches run in the root namespace, so every link has at least one
+interface whose byte counters the root can read.  LinkSampler reads the
+counters of all those interfaces at once every interval seconds (tens
+of ms are fine) from /proc/net/dev, which holds the same rx_bytes and
+tx_bytes as /sys/class/net/*/statistics but in one file, and keeps them
+as one array per sample.  Rates are the differences between successive
+arrays, for both directions of every link of the Topo.
+
+    sampler = LinkSampler(net, interval=0.05)
+    sampler.start()
+    ... run the test ...
+    sampler.stop()
+    sampler.writeSeries('links.txt')      time series in Mbit/s
+    sampler.writeRanking('hot_links.txt') links sorted by utilization
+    print sampler.report()                top five
+
+addTo(run) writes both files into a results Run and adds the mean and
+peak rate of every link direction to it.
+"""
+
+import threading
+from array import array
+from collections import namedtuple
+from time import time
+
+LinkLoad = namedtuple('LinkLoad',
+                      'src dst bw meanMbps peakMbps meanUtil peakUtil '
+                      'saturated')
+
+
+def readCounters(path='/proc/net/dev'):
+    "{interface: (rx_bytes, tx_bytes)} of the root namespace"
+    counters = {}
+    with open(path) as f:
+        lines = f.read().split('\n')[2:]
+    for line in lines:
+        name, _sep, fields = line.partition(':')
+        fields = fields.split()
+        if len(fields) >= 9:
+            counters[name.strip()] = (int(fields[0]), int(fields[8]))
+    return counters
+
+
+def linkDirections(net):
+    """Root namespace interface and counter for both directions of every
+       link
+       returns: list of (from node, to node, interface, 'tx' or 'rx', bw)"""
+    directions = []
+    for link in net.links:
+        intf1, intf2 = link.intf1, link.intf2
+        if not intf1.node.inNamespace:
+            intf, near, far = intf1, intf1.node, intf2.node
+        elif not intf2.node.inNamespace:
+            intf, near, far = intf2, intf2.node, intf1.node
+        else:
+            continue
+        bw = intf1.params.get('bw') or intf2.params.get('bw')
+        directions.append((near.name, far.name, intf.name, 'tx', bw))
+        directions.append((far.name, near.name, intf.name, 'rx', bw))
+    return directions
+
+
+class LinkSampler(threading.Thread):
+    "Samples the byte counters of every link in the background"
+
+    def __init__(self, net, interval=0.05, saturation=0.9):
+        """net: Mininet
+           interval: seconds between samples
+           saturation: utilization counted as saturated in the ranking"""
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.saturation = saturation
+        self.directions = linkDirections(net)
+        self.times = array('d')
+        self.counters = []
+        self.done = threading.Event()
+
+    def sample(self):
+        now = time()
+        current = readCounters()
+        values = array('d', [0.0]) * len(self.directions)
+        for i, (_src, _dst, intf, kind, _bw) in enumerate(self.directions):
+            rx, tx = current.get(intf, (0, 0))
+            values[i] = tx if kind == 'tx' else rx
+        self.times.append(now)
+        self.counters.append(values)
+
+    def run(self):
+        self.sample()
+        deadline = time()
+        while True:
+            deadline += self.interval
+            if self.done.wait(max(0, deadline - time())):
+                break
+            self.sample()
+        self.sample()
+
+    def stop(self):
+        "Stop sampling and wait for the last sample"
+        self.done.set()
+        self.join()
+
+    def rates(self):
+        """Mbit/s of every link direction between successive samples
+           returns: (midpoint times, list of rate arrays)"""
+        times, counters = self.times, self.counters
+        mids, rates = array('d'), []
+        for k in range(1, len(counters)):
+            span = times[k] - times[k - 1]
+            if span <= 0:
+                continue
+            scale = 8 / (span * 1e6)
+            before, after = counters[k - 1], counters[k]
+            rates.append(array('d', [(a - b) * scale
+                                     for a, b in zip(after, before)]))
+            mids.append((times[k] + times[k - 1]) / 2)
+        return mids, rates
+
+    def ranking(self):
+        "LinkLoad of every link direction, most utilized first"
+        _mids, rates = self.rates()
+        loads = []
+        for i, (src, dst, _intf, _kind, bw) in enumerate(self.directions):
+            series = [r[i] for r in rates] or [0.0]
+            mean = sum(series) / len(series)
+            peak = max(series)
+            if bw:
+                saturated = sum(1 for rate in series
+                                if rate >= self.saturation * bw)
+                loads.append(LinkLoad(src, dst, bw, mean, peak, mean / bw,
+                                      peak / bw,
+                                      float(saturated) / len(series)))
+            else:
+                loads.append(LinkLoad(src, dst, None, mean, peak, None,
+                                      None, None))
+        # Links with a known bw by utilization, then the rest by rate
+        loads.sort(key=lambda l: (l.meanUtil is None, -(l.meanUtil or 0),
+                                  -l.meanMbps))
+        return loads
+
+    def writeSeries(self, filename):
+        "One row per sample interval, one column (Mbit/s) per link direction"
+        mids, rates = self.rates()
+        start = self.times[0] if self.times else 0
+        with open(filename, 'w') as f:
+            f.write('\t'.join(['time'] + ['%s->%s' % d[:2]
+                                          for d in self.directions]) + '\n')
+            for mid, row in zip(mids, rates):
+                f.write('%.4f\t' % (mid - start) +
+                        '\t'.join('%.3f' % rate for rate in row) + '\n')
+
+    def writeRanking(self, filename, top=None):
+        "Link directions sorted by mean utilization"
+        def number(value, fmt='%.3f'):
+            return '-' if value is None else fmt % value
+        with open(filename, 'w') as f:
+            f.write('link\tbw\tmeanMbps\tpeakMbps\tmeanUtil\tpeakUtil'
+                    '\tsaturated\n')
+            for l in self.ranking()[:top]:
+                f.write('%s\t%s\t%.3f\t%.3f\t%s\t%s\t%s\n' %
+                        ('%s->%s' % (l.src, l.dst), number(l.bw, '%g'), l.meanMbps, l.peakMbps,
+                         number(l.meanUtil), number(l.peakUtil),
+                         number(l.saturated)))
+
+    def addTo(self, run):
+        """Write links.txt and hot_links.txt into a results Run and add the
+           mean and peak rate of every link direction as metrics"""
+        self.writeSeries(run.path('links.txt'))
+        self.writeRanking(run.path('hot_links.txt'))
+        for l in self.ranking():
+            run.add(l.src, l.dst, 'link_mean_mbps', l.meanMbps)
+            run.add(l.src, l.dst, 'link_peak_mbps', l.peakMbps)
+            if l.meanUtil is not None:
+                run.add(l.src, l.dst, 'link_util', l.meanUtil)
+
+    def report(self, top=5):
+        "One line per most utilized link direction"
+        lines = []
+        for l in self.ranking()[:top]:
+            if l.bw:
+                lines.append('%-24s mean %8.2f Mbps (%3.0f%%)  peak %8.2f '
+                             'Mbps (%3.0f%%)' %
+                             ('%s->%s' % (l.src, l.dst), l.meanMbps,
+                              100 * l.meanUtil, l.peakMbps, 100 * l.peakUtil))
+            else:
+                lines.append('%-24s mean %8.2f Mbps  peak %8.2f Mbps' %
+                             ('%s->%s' % (l.src, l.dst), l.meanMbps,
+                              l.peakMbps))
+        return '\n'.join(lines)
@@ -0,0 +1,162 @@
+"""
+Author: Brian Lebiednik
+
+Single process follower for the per host output files.
+
+monitorFiles() used to start one 'tail -f' per host, which at 512 hosts
+meant 512 extra processes and pipes competing with the emulation.
+FileFollower watches every file through one inotify descriptor that is
+waited on with epoll, and reads the new data of a file only when the
+kernel reports that it was modified.  If inotify is not available the
+files are polled every timeoutms instead, still from this one process.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+from select import epoll, EPOLLIN
+from time import time, sleep
+
+IN_MODIFY = 0x00000002
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_eventHeader = struct.Struct('iIII')
+
+_libc = None
+
+if bytes is str:
+    def _text(data):
+        return data
+else:
+    def _text(data):
+        return data.decode('utf-8', 'replace')
+
+
+def _inotify():
+    "libc with inotify support, or None"
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                               use_errno=True)
+            libc.inotify_init1
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+class FileFollower(object):
+    "Follow a set of growing files and return their new lines"
+
+    def __init__(self, outfiles, timeoutms=500):
+        """outfiles: map of host to output file name
+           timeoutms: polling interval when inotify is not available"""
+        self.timeoutms = timeoutms
+        self.fds, self.partial = {}, {}
+        self.notifyFd, self.poller, self.watches = None, None, {}
+        for host, outfile in outfiles.items():
+            fd = os.open(outfile, os.O_RDONLY | os.O_CREAT | os.O_NONBLOCK)
+            self.fds[host] = fd
+            self.partial[host] = b''
+        libc = _inotify()
+        if libc:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self.notifyFd = fd
+                for host, outfile in outfiles.items():
+                    wd = libc.inotify_add_watch(fd, outfile.encode('utf-8'),
+                                                IN_MODIFY)
+                    if wd < 0:
+                        raise OSError(ctypes.get_errno(),
+                                      'inotify_add_watch %s' % outfile)
+                    self.watches[wd] = host
+                self.poller = epoll()
+                self.poller.register(fd, EPOLLIN)
+
+    def readHost(self, host):
+        "Read everything new from the file of host; returns its lines"
+        fd = self.fds[host]
+        chunks = [self.partial[host]]
+        # The file may have been truncated ('echo >') since we last read
+        if os.fstat(fd).st_size < os.lseek(fd, 0, os.SEEK_CUR):
+            os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            chunks.append(data)
+        data = b''.join(chunks)
+        lines = data.split(b'\n')
+        self.partial[host] = lines.pop()
+        return [(host, _text(line.strip())) for line in lines if line.strip()]
+
+    def readAll(self):
+        "Read every file"
+        lines = []
+        for host in self.fds:
+            lines.extend(self.readHost(host))
+        return lines
+
+    def wait(self, seconds):
+        """Wait at most seconds for files to change
+           returns: list of (host, line) for the new complete lines"""
+        if self.poller is None:
+            sleep(min(seconds, self.timeoutms / 1000.0))
+            return self.readAll()
+        try:
+            events = self.poller.poll(seconds)
+        except IOError as e:
+            if e.errno != errno.EINTR:
+                raise
+            return []
+        if not events:
+            return []
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.notifyFd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = _eventHeader.unpack_from(
+                    data, offset)
+                offset += _eventHeader.size + length
+                if wd in self.watches:
+                    changed.add(self.watches[wd])
+        lines = []
+        for host in changed:
+            lines.extend(self.readHost(host))
+        return lines
+
+    def close(self):
+        if self.poller is not None:
+            self.poller.close()
+            os.close(self.notifyFd)
+            self.poller = None
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds = {}
+
+
+def monitorFiles(outfiles, seconds, timeoutms=500):
+    """Monitor set of files and return [(host, line)...]
+       Only complete, non-empty lines are returned, and nothing is
+       yielded while the files are idle."""
+    follower = FileFollower(outfiles, timeoutms)
+    try:
+        for item in follower.readAll():
+            yield item
+        endTime = time() + seconds
+        remaining = seconds
+        while remaining > 0:
+            for item in follower.wait(remaining):
+                yield item
+            remaining = endTime - time()
+    finally:
+        follower.close()
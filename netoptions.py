@@ -0,0 +1,106 @@
+"""
+Author: Brian Lebiednik
+
+Network options shared by perfTest(), sweep() and benchmark.py.
+
+Each option picks how the network is built and brought up; all are off
+by default, so the plain Mininet(link=TCLink) start is what runs unless
+asked otherwise:
+
+    fastStart    batch veth creation and tc shaping, see faststart.py
+    proactive    shortest path flows instead of POX, see proactive.py
+    routed       switches become LinuxRouters with static routes, see
+                 routed.py
+    multipath    with proactive or routed, ECMP over all shortest paths
+    addressPlan  hosts numbered 10.pod.edge.n, one flow or route per
+                 prefix, see addrplan.py
+    staticArp    static ARP in every host and MACs pre-learned in the
+                 switches, see staticarp.py
+    ipBase       addresses of the hosts without an address plan
+
+    options = netOptions(fastStart=True, proactive=True)
+    net, plan = buildNet(topo, options)
+    startNet(net, topo, options, plan)
+    connectNet(net, topo, options, plan)
+"""
+
+from mininet.link import TCLink
+from mininet.log import info
+from mininet.net import Mininet
+from mininet.node import RemoteController, OVSKernelSwitch
+
+from addrplan import AddressPlan
+from faststart import FastMininet
+from proactive import installFlows
+from routed import LinuxRouter, installRoutes
+from staticarp import warmStart
+
+defaults = {'fastStart': False, 'proactive': False, 'routed': False,
+            'multipath': False, 'addressPlan': False, 'staticArp': False,
+            'ipBase': '192.168.0.0/16'}
+
+
+def netOptions(options=None, **overrides):
+    """The defaults updated with options and overrides
+       options: dict that may hold other keys too (e.g. a benchmark
+       matrix); only the network options are taken from it"""
+    unknown = set(overrides) - set(defaults)
+    if unknown:
+        raise ValueError('unknown network options %s, use %s' %
+                         (', '.join(sorted(unknown)),
+                          ', '.join(sorted(defaults))))
+    merged = dict(defaults)
+    merged.update((key, value) for key, value in (options or {}).items()
+                  if key in defaults)
+    merged.update(overrides)
+    return merged
+
+
+def routingFor(options):
+    "Routing fairshare.py should assume for these options"
+    return 'ecmp' if options['multipath'] else 'single'
+
+
+def buildNet(topo, options):
+    """Address the hosts and build the network, not started yet; POX
+       controls the switches unless they are proactive or routed
+       returns: (net, AddressPlan or None)"""
+    plan = None
+    if options['addressPlan']:
+        plan = AddressPlan(topo)
+        plan.apply(topo)
+    controlled = not options['proactive'] and not options['routed']
+    controller = RemoteController if controlled else None
+    switch = LinuxRouter if options['routed'] else OVSKernelSwitch
+    if options['fastStart']:
+        net = FastMininet(topo=topo, controller=controller, switch=switch,
+                          ipBase=options['ipBase'])
+    else:
+        net = Mininet(topo=topo, controller=controller, switch=switch,
+                      link=TCLink, ipBase=options['ipBase'])
+    return net, plan
+
+
+def startNet(net, topo, options, plan=None):
+    """Start the network, with the time per phase of a fast start, and
+       install the proactive flows or static routes"""
+    net.start()
+    if options['fastStart']:
+        info('*** Startup time per phase (s)\n%s\n' % net.startupReport())
+    if options['proactive']:
+        installFlows(net, topo, multipath=options['multipath'], plan=plan)
+    elif options['routed']:
+        installRoutes(net, topo, multipath=options['multipath'], plan=plan)
+
+
+def connectNet(net, topo, options, plan=None):
+    """Wait for the switches to connect to POX, when there is one, then
+       fill in ARP and the switches' MAC rules with staticArp"""
+    controlled = not options['proactive'] and not options['routed']
+    if controlled:
+        net.waitConnected()
+    if options['staticArp']:
+        entries, rules = warmStart(net, topo, learn=controlled, plan=plan)
+        info('*** Static ARP: %d neighbour entries, %d switch rules\n' %
+             (entries, rules))
+
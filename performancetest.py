@@ -6,21 +6,36 @@ from mininet.node import CPULimitedHost
 from mininet.link import TCLink
 from mininet.util import dumpNodeConnections
 from mininet.log import setLogLevel
-from mininet.node import RemoteController
 from mininet.node import Controller
 from mininet.cli import CLI
 import os
 import time
-import thread
 from time import time, sleep
-from select import poll, POLLIN
-from subprocess import Popen, PIPE
+from convergence import waitConverged
+from netoptions import netOptions, routingFor, buildNet, startNet, connectNet
+from teardown import teardown
+from experiments import pingTest
+from flows import runIperfFlows, flowSummary, writeFlows
+from fairshare import predictRates, compareFlows, writeComparison
+from results import ResultStore
+from profiler import PhaseProfiler
+from linkstats import LinkSampler
+from qdiscstats import QdiscCollector
+from traffic import topoPairs, uniquePairs
+from topogen import fatTreeSpec, KaryFatTreeTopo, RecursiveDcellTopo
+from topogen import FacebookFabricTopo
 
 """
 Author: Brian Lebiednik
 
 Requires a custom controller with the command as follows on xterm1
 ./pox.py forwarding.l2_pairs openflow.discovery misc.full_payload openflow.of_01 --port=6653
+or netOptions(proactive=True) in perfTest(), which installs shortest path flows itself
+Adding multipath=True to the options spreads flows over all equal cost paths, so FatTreeTopo and
+Facebook run with every link instead of the tree STP leaves
+or routed=True, which replaces the switches by LinuxRouters with static routes (see routed.py)
+staticArp=True fills in ARP and the switches' MAC rules before the tests (see staticarp.py)
+All network options are listed in netoptions.py
 
 
 Usage
@@ -29,49 +44,21 @@ sudo python performancetest.py
 Currently you can change the following line to change the topology that the program runs
 
 topo = {}(n=4)
-{FatTreeTopotest, FatTreeTopo, Dcell, DcellNoLoop, Facebook, FatTreeTopoNoLoop}
+{FatTreeTopotest, FatTreeTopo, Dcell, DcellNoLoop, Facebook, FatTreeTopoNoLoop,
+ KaryFatTreeTopo, RecursiveDcellTopo, FacebookFabricTopo}
 
-To kill a mininet process running in the background issue a 'sudo mn -c'
+KaryFatTreeTopo(k=8, hostsPerEdge=4) builds any k-ary fat tree
+RecursiveDcellTopo(n=4, k=2) builds a DCell_2 of 4 server cells
+FacebookFabricTopo(pods=4, planes=4) builds a multi-pod Facebook fabric
+SpecTopo('mytopo.topo') or SpecTopo(cachedSpec('fattree', k=16)) loads a
+topology file or a cached generated topology; import them first with
+from topofile import SpecTopo, cachedSpec
 
+To kill a mininet process running in the background issue a
+'sudo python teardown.py' (or the slower 'sudo mn -c')
 
-"""
 
-def iperf_thread(net, src, dst):
-    host_pair = [src, dst]
-    bandwidth = net.iperf(host_pair, seconds = 5)
-
-def monitorFiles( outfiles, seconds, timeoutms ):
-    "Monitor set of files and return [(host, line)...]"
-    devnull = open( '/dev/null', 'w' )
-    tails, fdToFile, fdToHost = {}, {}, {}
-    for h, outfile in outfiles.iteritems():
-        tail = Popen( [ 'tail', '-f', outfile ],
-                      stdout=PIPE, stderr=devnull )
-        fd = tail.stdout.fileno()
-        tails[ h ] = tail
-        fdToFile[ fd ] = tail.stdout
-        fdToHost[ fd ] = h
-    # Prepare to poll output files
-    readable = poll()
-    for t in tails.values():
-        readable.register( t.stdout.fileno(), POLLIN )
-    # Run until a set number of seconds have elapsed
-    endTime = time() + seconds
-    while time() < endTime:
-        fdlist = readable.poll(timeoutms)
-        if fdlist:
-            for fd, _flags in fdlist:
-                f = fdToFile[ fd ]
-                host = fdToHost[ fd ]
-                # Wait for a line of output
-                line = f.readline().strip()
-                yield host, line
-        else:
-            # If we timed out, return nothing
-            yield None, ''
-    for t in tails.values():
-        t.terminate()
-    devnull.close()  # Not really necessary
+"""
 
 class Facebook(Topo):
     "Creates a Facebook database configuration 5 interconnected cells"
@@ -343,44 +330,11 @@ class FatTreeTopoNoLoop(Topo):
 
 
 class FatTreeTopo(Topo):
-    "Creates a Fat Tree Topology with 2 core routers, 8 aggregate, 8 edge, and 8 hosts"
-    def build(self, n=2):
-        core = 4
-        switch_type = 'ovsbk'
-        link_bandwidth = 10
-        link_delay = '.001ms'
-        corerouters = {}
-        aggrouters = {}
-        edgerouters = {}
-        host = {}
-
-        for x in range(0, 2):
-            corerouters[x] = self.addSwitch('cr'+str(x), switch = switch_type, stp=1)
-
-        for x in range(0,(core * 2)):
-            aggrouters[x] = self.addSwitch('ar'+str(x), switch = switch_type, stp=1 )
-
-        for x in range(0, (core *2)):
-            edgerouters[x] = self.addSwitch('er'+str(x), switch = switch_type, stp=1 )
-
-        for x in range(0, (core *2)):
-            host[x] = self.addHost('h'+str(x))
-        for x in range(0,core*2, 2):
-            self.addLink(corerouters[0], aggrouters[x], bw=link_bandwidth, delay=link_delay)
-            self.addLink(corerouters[1], aggrouters[x], bw=10, delay=link_delay)
-        for x in range(1, core*2, 2):
-            self.addLink(corerouters[2], aggrouters[x], bw=link_bandwidth, delay=link_delay)
-            self.addLink(corerouters[3], aggrouters[x], bw=10, delay=link_delay)
-
-        for x in range(0, (core*2), 2):
-            self.addLink(aggrouters[x], edgerouters[x], bw=link_bandwidth, delay=link_delay)
-            self.addLink(aggrouters[x], edgerouters[x+1], bw=10, delay=link_delay)
-        for x in range(1, (core*2), 2):
-            self.addLink(aggrouters[x], edgerouters[x], bw=link_bandwidth, delay=link_delay)
-            self.addLink(aggrouters[x], edgerouters[x-1], bw=10, delay=link_delay)
-        for x in range(0, core*2):
-            self.addLink(host[x], edgerouters[x],
-               bw=10, delay=link_delay)
+    "Creates a Fat Tree Topology with 4 core routers, 8 aggregate, 8 edge, and 8 hosts"
+    def build(self, n=2, k=4, hostsPerEdge=1):
+        # k=4 gives the cr0-cr3 / ar0-ar7 / er0-er7 wiring; STP breaks the loops
+        fatTreeSpec(k, hostsPerEdge,
+                    switchOpts={'switch': 'ovsbk', 'stp': 1}).addTo(self)
 
 def perfTest():
     "Create network and run simple performance test"
@@ -388,19 +342,38 @@ def perfTest():
     topo = FatTreeTopoNoLoop(n=4)
     test = 'FatTreeTopoNoLoop'
     run_test = 2 #Set to 1 for IPERF test or 2 for Ping Test
-    net = Mininet(topo=topo, controller=RemoteController, link=TCLink, ipBase='192.168.0.0/24')
-
-    net.start()
+    # Traffic patterns from traffic.py: bitcomplement, bitreversal,
+    # permutation, stride, hotspot, alltoall, podlocal, crosspod, dcellpeers
+    ping_pattern = 'stride'
+    iperf_pattern = 'bitcomplement'
+    pattern_args = {} #e.g. {'k': 2} for stride or {'seed': 1} for permutation
+    # Network options from netoptions.py: fastStart, proactive, routed,
+    # multipath, addressPlan, staticArp, ipBase
+    options = netOptions()
+    routing = routingFor(options) #Routing assumed by the iperf prediction
+    # Time and resources per phase, see profiler.py
+    profiler = PhaseProfiler(label=test)
+    link_interval = 0.05 #Seconds between link samples, see linkstats.py
+    qdisc_interval = 1.0 #Seconds between qdisc polls, see qdiscstats.py
+    profiler.phase('build')
+    net, plan = buildNet(topo, options)
+
+    profiler.phase('start')
+    startNet(net, topo, options, plan)
     seconds = 10
     #dumpNodeConnections(net.hosts) #Dumps the connections from each host
-    net.waitConnected()
+    profiler.phase('waitConnected')
+    connectNet(net, topo, options, plan)
 
 
     print "Waiting for network to converge"
-    net.pingAll()
+    profiler.phase('converge')
+    converged = waitConverged(net, topo)
+    print "Converged", converged['converged'], "in %.2f seconds" % converged['seconds']
     host = {}
     
     print "Starting tests"
+    profiler.phase('test')
     if (test == 'FatTreeTopoNoLoop' or test == 'FatTreeTopo' or test == 'FatTreeTopotest'):
         max_host = 8
         for y in range(0, max_host):
@@ -422,169 +395,82 @@ def perfTest():
             print "Adding %s" % host_name
             host[x] = net.get(host_name)
 
+    elif (test == 'KaryFatTreeTopo' or test == 'RecursiveDcellTopo' or
+          test == 'FacebookFabricTopo' or test == 'SpecTopo'):
+        max_host = len(topo.hosts())
+        for y in range(0, max_host):
+            host_name = 'h' +str(y)
+            host[y] = net.get(host_name)
+
+    store = ResultStore() #Every run is kept under ./results, see results.py
+    links = LinkSampler(net, interval=link_interval)
+    links.start()
+    queues = QdiscCollector(net, interval=qdisc_interval)
+    queues.start()
     if (run_test == 1):
         print "IPERF Testing"
-        if ((max_host%2) == 0):
-            for x in range(0, (max_host/2)):
-                src = host[x]
-                dst = host[(max_host-1)-x]
-                thread.start_new_thread(iperf_thread, (net, src, dst))
-            sleep(10)
-            for x in range(0, (max_host/2)):
-                dst = host[x]
-                src = host[(max_host-1)-x]
-                thread.start_new_thread(iperf_thread, (net, src, dst))
-            sleep(10)
+        if (test == 'Dcell' or test == 'DcellNoLoop'):
+            iperf_pattern = 'dcellpeers'
+            pairs = topoPairs('dcellpeers', topo, max_host)
         else:
-            dst = host[0]
-            src = host[5]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[1]
-            src = host[10]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[2]
-            src = host[15]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[3]
-            src = host[20]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[6]
-            src = host[11]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[7]
-            src = host[16]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[8]
-            src = host[21]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[12]
-            src = host[17]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[13]
-            src = host[22]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            dst = host[18]
-            src = host[23]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            sleep(10)
-
-            src = host[0]
-            dst = host[5]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[1]
-            dst = host[10]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[2]
-            dst = host[15]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[3]
-            dst = host[20]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[6]
-            dst = host[11]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[7]
-            dst = host[16]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[8]
-            dst = host[21]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[12]
-            dst = host[17]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[13]
-            dst = host[22]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            src = host[18]
-            dst = host[23]
-            thread.start_new_thread(iperf_thread, (net, src, dst))
-            sleep(10)
-
-
-    elif (run_test ==2 and test =='DcellNoLoop'):
-
-        print "Ping Testing"
-        outfiles, errfiles = {}, {}
-        packetsize = 1454
-        #max packet size 1472. MTU set to 1500
-        bottom = 0
-        for h in range(0, max_host):
-            # Create and/or erase output files
-            outfiles[ host[h] ] = '/tmp/%s.out' % host[h].name
-            errfiles[ host[h] ] = '/tmp/%s.err' % host[h].name
-            host[h].cmd( 'echo >', outfiles[ host[h] ] )
-            host[h].cmd( 'echo >', errfiles[ host[h] ] )
-            # Start pings
-
-            if (h<max_host-5):
-                host[h].cmdPrint('ping', host[h+5].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-            else:
-                host[h].cmdPrint('ping', host[bottom].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-                bottom = bottom +1
-
-
-        print "Monitoring output for", seconds, "seconds"
-        f = open('output%s.txt' % str(packetsize), 'w')
-        for host[h], line in monitorFiles( outfiles, seconds, timeoutms=500 ):
-            if host[h]:
-                f.write(line)
-
-
-
-        #Still working on killing ping. Run as last test.
-        #for h in range(0, max_host):
-            #host[h].cmd( 'kill %ping')
-
-
-        sleep(11)
-    elif (run_test ==2 and test !='DcellNoLoop'):
+            pairs = topoPairs(iperf_pattern, topo, max_host, **pattern_args)
+        run = store.newRun(test, hosts=max_host, kind='iperf',
+                           pattern=iperf_pattern, routing=routing)
+        pairs = uniquePairs(pairs)
+        results = runIperfFlows(host, pairs, seconds=5)
+        results += runIperfFlows(host, [(dst, src) for src, dst in pairs],
+                                 seconds=5)
+        writeFlows(results, run.path('iperf.txt'))
+        print "Flow summary", flowSummary(results)
+        # Max-min fair rates the topology allows, to compare with iperf
+        predicted = predictRates(topo, host, pairs, routing)
+        predicted += predictRates(topo, host,
+                                  [(dst, src) for src, dst in pairs], routing)
+        rows = compareFlows(predicted, results)
+        writeComparison(rows, run.path('iperf_predicted.txt'))
+        print "Flows below their fair share", \
+            len([row for row in rows if row.limit != 'topology'])
+        run.addFlows(results)
+        run.addFlows(predicted, 'predicted_mbps')
+
+    elif (run_test ==2):
         print "Ping Testing"
-        outfiles, errfiles = {}, {}
         packetsize = 54
         #max packet size 1472. MTU set to 1500
-
-        for h in range(0, max_host):
-            # Create and/or erase output files
-            outfiles[ host[h] ] = '/tmp/%s.out' % host[h].name
-            errfiles[ host[h] ] = '/tmp/%s.err' % host[h].name
-            host[h].cmd( 'echo >', outfiles[ host[h] ] )
-            host[h].cmd( 'echo >', errfiles[ host[h] ] )
-            # Start pings
-
-            if (h<max_host-1):
-                host[h].cmdPrint('ping', host[h+1].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-            else:
-                host[h].cmdPrint('ping', host[0].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-
-
-        print "Monitoring output for", seconds, "seconds"
-        f = open('output%s.txt' % str(packetsize), 'w')
-        for host[h], line in monitorFiles( outfiles, seconds, timeoutms=500 ):
-            if host[h]:
-                f.write(line)
-
-
-
-        #Still working on killing ping. Run as last test.
-        #for h in range(0, max_host):
-            #host[h].cmd( 'kill %ping')
-
-
-        sleep(11)
+        if (test == 'DcellNoLoop'):
+            packetsize = 1454
+            pairs = topoPairs('stride', topo, max_host, k=5)
+            ping_pattern = 'stride'
+        else:
+            pairs = topoPairs(ping_pattern, topo, max_host, **pattern_args)
+        run = store.newRun(test, hosts=max_host, packetsize=packetsize,
+                           kind='ping', pattern=ping_pattern)
+        stats = pingTest(host, pairs, packetsize, seconds, outdir=run.dir,
+                         sink=run.addPing)
+        stats.write(run.path('output%s.txt' % str(packetsize)))
+
+    links.stop()
+    print "Most utilized links"
+    print links.report()
+    queues.stop()
+    print "Most loaded queues"
+    print queues.report()
     print "Ending tests"
-    net.stop()
+    profiler.phase('teardown')
+    teardown(net)
+    profiler.stop()
+    print "Time and peak resources per phase"
+    print profiler.report()
+
+    if (run_test == 1 or run_test == 2):
+        run.add('-', '-', 'convergence_s', converged['seconds'])
+        for phase, phase_seconds in profiler.durations():
+            run.add('-', '-', 'phase_%s_s' % phase, phase_seconds)
+        profiler.write(run.path('profile.json'))
+        links.addTo(run)
+        queues.addTo(run)
+        run.close()
+        print "Results in", run.dir
     #CLI( net )
 
 
@@ -0,0 +1,260 @@
+"""
+Author: Brian Lebiednik
+
+Streaming parser and constant memory statistics for ping output.
+
+pingRecords() sits behind monitorFiles() and turns every ping line into a
+PingRecord(src, dst, seq, ttl, rtt).  PingStats keeps, for every
+(src, dst) pair, the count, min, mean, max and standard deviation of the
+RTT (Welford's method), the loss from the icmp_seq numbers and a fixed
+size log-linear histogram for percentiles, so the memory used does not
+grow with the length of the run.
+
+Run ping with -O: a request that is still unanswered when the next one
+goes out then prints 'no answer yet for icmp_seq=N'.  Without it lost
+requests print nothing, so a pair that never gets a reply has no
+sequence numbers to count and shows no loss at all.
+
+Usage
+    stats = PingStats(names)
+    for record in pingRecords(monitorFiles(outfiles, seconds)):
+        stats.add(record)
+    stats.write('output%s.txt' % packetsize)
+"""
+
+import math
+import re
+from array import array
+from collections import namedtuple
+
+PingRecord = namedtuple('PingRecord', 'src dst seq ttl rtt')
+
+_reply = re.compile(r'from (\S+?):? icmp_seq=(\d+) ttl=(\d+) time=([\d.]+)')
+_error = re.compile(r'^From (\S+) icmp_seq=(\d+) (.*)')
+_noAnswer = re.compile(r'^no answer yet for icmp_seq=(\d+)')
+
+
+def _name(host):
+    """Host objects print as their name; a (src, dst) key from a test
+       with several destinations per host names its source"""
+    if isinstance(host, tuple):
+        host = host[0]
+    return host if isinstance(host, str) else str(host)
+
+
+def parsePing(src, line):
+    """Parse one line of ping output
+       returns: PingRecord, with rtt None for an error reply such as
+       Destination Host Unreachable or a request without an answer, or
+       None for other lines"""
+    if 'DUP!' in line:
+        return None
+    match = _reply.search(line)
+    if match:
+        dst, seq, ttl, rtt = match.groups()
+        return PingRecord(src, dst, int(seq), int(ttl), float(rtt))
+    match = _error.match(line)
+    if match:
+        return PingRecord(src, None, int(match.group(2)), None, None)
+    match = _noAnswer.match(line)
+    if match:
+        return PingRecord(src, None, int(match.group(1)), None, None)
+    return None
+
+
+def pingRecords(lines):
+    "Turn (host, line) pairs from monitorFiles() into PingRecords"
+    for host, line in lines:
+        if host:
+            record = parsePing(_name(host), line)
+            if record:
+                if record.dst is None and isinstance(host, tuple):
+                    record = record._replace(dst=_name(host[1]))
+                yield record
+
+
+class LatencyHistogram(object):
+    """Fixed bucket latency histogram in microseconds.
+       Values below 2^subBits have their own bucket; above that every
+       power of two is split into 2^subBits buckets, so each bucket is
+       within 1/2^subBits of its values (6% for the default 4 bits)."""
+
+    def __init__(self, subBits=4, maxBits=32):
+        self.subBits = subBits
+        self.sub = 1 << subBits
+        self.counts = array('L', [0]) * ((maxBits - subBits + 1) * self.sub)
+
+    def index(self, value):
+        if value < self.sub:
+            return value
+        shift = value.bit_length() - self.subBits - 1
+        return min((shift + 1) * self.sub + (value >> shift) - self.sub,
+                   len(self.counts) - 1)
+
+    def lowest(self, index):
+        "Smallest value counted in bucket index"
+        if index < self.sub:
+            return index
+        shift = index // self.sub - 1
+        return (index % self.sub + self.sub) << shift
+
+    def add(self, usec):
+        self.counts[self.index(int(usec))] += 1
+
+    def merge(self, other):
+        counts = self.counts
+        for i, count in enumerate(other.counts):
+            if count:
+                counts[i] += count
+
+    def percentile(self, p):
+        "Value in microseconds below which p percent of the samples fall"
+        total = sum(self.counts)
+        if not total:
+            return None
+        wanted = max(1, int(math.ceil(total * p / 100.0)))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                # Middle of the bucket
+                return (self.lowest(i) + self.lowest(i + 1)) / 2.0
+        return None
+
+
+class PairStats(object):
+    "Running RTT statistics for one (src, dst) pair"
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+        self.firstSeq = None
+        self.lastSeq = None
+        self.ttl = None
+        self.histogram = LatencyHistogram()
+
+    def add(self, seq, rtt, ttl=None):
+        if self.firstSeq is None or seq < self.firstSeq:
+            self.firstSeq = seq
+        if self.lastSeq is None or seq > self.lastSeq:
+            self.lastSeq = seq
+        if rtt is None:
+            self.errors += 1
+            return
+        self.ttl = ttl
+        self.count += 1
+        delta = rtt - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (rtt - self.mean)
+        if self.min is None or rtt < self.min:
+            self.min = rtt
+        if self.max is None or rtt > self.max:
+            self.max = rtt
+        self.histogram.add(rtt * 1000)
+
+    def sent(self):
+        "Echo requests between the first and last sequence number seen"
+        if self.firstSeq is None:
+            return 0
+        return self.lastSeq - self.firstSeq + 1
+
+    def loss(self):
+        "Fraction of the requests that got no reply"
+        sent = self.sent()
+        return 1.0 - float(self.count) / sent if sent else 0.0
+
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, p):
+        "RTT percentile in ms"
+        usec = self.histogram.percentile(p)
+        return usec / 1000.0 if usec is not None else None
+
+
+class PingStats(object):
+    "Per pair ping statistics fed from a stream of PingRecords"
+
+    columns = ('src', 'dst', 'sent', 'recv', 'loss%', 'min', 'avg', 'max',
+               'mdev', 'p50', 'p90', 'p99')
+    percentiles = (50, 90, 99)
+
+    def __init__(self, names=None):
+        "names: optional map of IP address to host name for the dst column"
+        self.names = names or {}
+        self.pairs = {}
+        self.lastDst = {}
+
+    def add(self, record):
+        dst = record.dst
+        if dst is None:
+            # Errors come from the local host; charge them to the last
+            # destination that the source pinged
+            dst = self.lastDst.get(record.src)
+            if dst is None:
+                return
+        else:
+            dst = self.names.get(dst, dst)
+            self.lastDst[record.src] = dst
+        key = (record.src, dst)
+        stats = self.pairs.get(key)
+        if stats is None:
+            stats = self.pairs[key] = PairStats()
+        stats.add(record.seq, record.rtt, record.ttl)
+
+    def addLines(self, lines):
+        "Consume (host, line) pairs, e.g. straight from monitorFiles()"
+        for record in pingRecords(lines):
+            self.add(record)
+        return self
+
+    def total(self):
+        "All pairs merged into one PairStats"
+        total = PairStats()
+        for stats in self.pairs.values():
+            if not stats.count:
+                total.errors += stats.errors
+                continue
+            # Chan et al. parallel merge of mean and M2
+            count = total.count + stats.count
+            delta = stats.mean - total.mean
+            total.m2 += stats.m2 + delta * delta * total.count * \
+                stats.count / count
+            total.mean += delta * stats.count / count
+            total.count = count
+            total.errors += stats.errors
+            total.min = stats.min if total.min is None else \
+                min(total.min, stats.min)
+            total.max = stats.max if total.max is None else \
+                max(total.max, stats.max)
+            total.histogram.merge(stats.histogram)
+        total.firstSeq = 1
+        total.lastSeq = sum(s.sent() for s in self.pairs.values())
+        return total
+
+    def row(self, src, dst, stats):
+        def ms(value):
+            return '-' if value is None else '%.3f' % value
+        return [src, dst, str(stats.sent()), str(stats.count),
+                '%.1f' % (100 * stats.loss()), ms(stats.min),
+                ms(stats.mean if stats.count else None), ms(stats.max),
+                ms(stats.stddev())] + \
+            [ms(stats.percentile(p)) for p in self.percentiles]
+
+    def rows(self):
+        "Summary rows, one per pair and a final 'all' row"
+        rows = [self.row(src, dst, self.pairs[(src, dst)])
+                for src, dst in sorted(self.pairs)]
+        rows.append(self.row('all', '-', self.total()))
+        return rows
+
+    def write(self, filename):
+        "Write the summary table; times are in ms"
+        with open(filename, 'w') as f:
+            f.write('\t'.join(self.columns) + '\n')
+            for row in self.rows():
+                f.write('\t'.join(row) + '\n')
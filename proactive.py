@@ -0,0 +1,237 @@
+"""
+Author: Brian Lebiednik
+
+Proactive shortest path forwarding, without a controller.
+
+With forwarding.l2_pairs the first packets of every pair wait for a
+packet-in round trip to POX, which shows up in the first ping samples.
+installFlows() instead computes, from the Topo graph, a shortest path
+tree towards every host and writes into each OVS bridge, before any
+traffic, one rule per host for its MAC and one for ARP requests for its
+IP:
+
+    priority=100,dl_dst=<mac>,actions=output:<port>
+    priority=100,arp,arp_tpa=<ip>,actions=output:<port>
+
+Each switch forwards over its first next hop in CSR order, the same
+path fairshare.py predicts with routing='single'.  Broadcasts other than
+ARP are dropped, so topologies with loops (Facebook, FatTreeTopo) need
+no spanning tree, and it is turned off: a port STP blocks would drop
+the traffic the rules send into it.  Every bridge gets its whole table
+with one 'ovs-ofctl replace-flows', all bridges at the same time.
+
+With multipath=True a switch with several shortest next hops towards a
+host sends to an OpenFlow 1.3 select group instead, one bucket per next
+hop, and OVS hashes every flow onto one of them (ECMP).  Switches share a
+group among all hosts reached over the same ports, so FatTreeTopo and
+Facebook use all of their core and aggregate links instead of the tree
+STP leaves; this is the routing='ecmp' case of fairshare.py.
+
+With the AddressPlan of addrplan.py, dl_dst and arp_tpa match whole pod
+and edge prefixes with masks wherever the hosts under them leave a
+switch the same way, so only an edge switch keeps one rule per host.
+
+Start Mininet with controller=None; OVS's secure fail mode then drops
+everything until the rules are in.  net.waitConnected() would wait for a
+controller forever, so skip it:
+
+    net = Mininet(topo=topo, controller=None, link=TCLink)
+    net.start()
+    installFlows(net, topo, multipath=True)
+"""
+
+from subprocess import Popen, PIPE, STDOUT
+
+from mininet.log import info, error
+
+from fairshare import hopsTo, nextHops
+from topostats import topoGraph
+
+PRIORITY = 100
+
+
+def switchPorts(net):
+    "{(switch, neighbour): OpenFlow port of the switch on their first link}"
+    switches = set(switch.name for switch in net.switches)
+    ports = {}
+    for link in net.links:
+        for intf, other in ((link.intf1, link.intf2),
+                            (link.intf2, link.intf1)):
+            key = (intf.node.name, other.node.name)
+            if key not in ports and key[0] in switches:
+                ports[key] = intf.node.ports[intf]
+    return ports
+
+
+def nextPorts(net, topo):
+    """Ports of every shortest next hop from each switch towards each host
+       returns: list of (switch, host, ports in CSR order)"""
+    graph = topoGraph(topo)
+    names, targets = graph.names, graph.targets
+    ports = switchPorts(net)
+    found = []
+    for dst, name in enumerate(names):
+        if graph.switch[dst]:
+            continue
+        dist = hopsTo(graph, dst)
+        for v, hops in enumerate(dist):
+            if hops <= 0 or not graph.switch[v]:
+                continue
+            hopPorts = []
+            for e in nextHops(graph, dist, v, dst):
+                port = ports[(names[v], names[targets[e]])]
+                if port not in hopPorts:
+                    hopPorts.append(port)
+            found.append((names[v], name, hopPorts))
+    return found
+
+
+def _rules(priority, mac, ip, action):
+    return ['priority=%d,dl_dst=%s,actions=%s' % (priority, mac, action),
+            'priority=%d,arp,arp_tpa=%s,actions=%s' % (priority, ip, action)]
+
+
+def _tables(net, topo, priority, plan, action):
+    """Rules of every switch, action(switch, ports) giving the actions
+       towards a host; with an AddressPlan one rule pair per aggregated
+       prefix instead of per host"""
+    actions = dict((switch.name, {}) for switch in net.switches)
+    for switch, host, hopPorts in nextPorts(net, topo):
+        actions[switch][host] = action(switch, hopPorts)
+    flows = {}
+    for switch, byHost in actions.items():
+        rules = flows[switch] = []
+        if plan is None:
+            for host in sorted(byHost):
+                node = net.get(host)
+                rules += _rules(priority, node.MAC(), node.IP(), byHost[host])
+        else:
+            for level, key, act in plan.aggregate(byHost):
+                rules += _rules(priority, plan.macPrefix(level, key),
+                                plan.ipPrefix(level, key), act)
+    return flows
+
+
+def shortestPathFlows(net, topo, priority=PRIORITY, plan=None):
+    """Rules for every switch: towards each host over the first shortest
+       next hop, matching its MAC and ARP requests for its IP
+       plan: AddressPlan, to match whole pods and edges where possible
+       returns: {switch name: list of ovs-ofctl flow strings}"""
+    return _tables(net, topo, priority, plan,
+                   lambda switch, hopPorts: 'output:%d' % hopPorts[0])
+
+
+def multipathFlows(net, topo, priority=PRIORITY, plan=None):
+    """Rules and select groups for every switch: towards each host over
+       all shortest next hops
+       plan: AddressPlan, to match whole pods and edges where possible
+       returns: ({switch: flow strings}, {switch: group strings})"""
+    groups = dict((switch.name, []) for switch in net.switches)
+    ids = {}
+
+    def action(switch, hopPorts):
+        if len(hopPorts) == 1:
+            return 'output:%d' % hopPorts[0]
+        key = (switch, tuple(hopPorts))
+        if key not in ids:
+            ids[key] = len(groups[switch]) + 1
+            groups[switch].append(
+                'group_id=%d,type=select,%s' %
+                (ids[key], ','.join('bucket=output:%d' % port
+                                    for port in hopPorts)))
+        return 'group:%d' % ids[key]
+
+    return _tables(net, topo, priority, plan, action), groups
+
+
+def _ofctl(command, tables, protocols=None):
+    """Run ovs-ofctl command on every bridge in parallel, with the bridge's
+       lines on stdin
+       tables: {bridge: list of lines}, None to send nothing
+       returns: bridges that failed"""
+    running = []
+    for bridge in sorted(tables):
+        cmd = ['ovs-ofctl']
+        if protocols:
+            cmd += ['-O', protocols]
+        cmd += [command, bridge]
+        lines = tables[bridge]
+        if lines is not None:
+            cmd.append('-')
+        proc = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT)
+        running.append((bridge, proc))
+        if lines is not None:
+            proc.stdin.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        proc.stdin.close()
+    failed = []
+    for bridge, proc in running:
+        output = proc.stdout.read().decode('utf-8', 'replace')
+        proc.wait()
+        if proc.returncode:
+            error('*** %s %s: %s\n' % (command, bridge, output.strip()))
+            failed.append(bridge)
+    return failed
+
+
+def replaceFlows(flows, protocols=None):
+    """Replace the flow table of every bridge, all bridges in parallel
+       flows: {bridge: list of flow strings}
+       protocols: ovs-ofctl -O argument, e.g. 'OpenFlow13'
+       returns: bridges that failed"""
+    return _ofctl('replace-flows', flows, protocols)
+
+
+def addFlows(flows, protocols=None):
+    """Add flows to every bridge, keeping the ones already there (e.g. a
+       controller's), all bridges in parallel
+       returns: bridges that failed"""
+    return _ofctl('add-flows', flows, protocols)
+
+
+def replaceGroups(groups, protocols='OpenFlow13'):
+    """Replace the group table of every bridge, all bridges in parallel
+       returns: bridges that failed"""
+    failed = _ofctl('del-groups', dict((bridge, None) for bridge in groups),
+                    protocols)
+    return failed + _ofctl('add-groups', dict(
+        (bridge, lines) for bridge, lines in groups.items()
+        if lines and bridge not in failed), protocols)
+
+
+def configureBridges(bridges, protocols='OpenFlow10,OpenFlow13', stp=False):
+    "Set the OpenFlow versions and spanning tree of all bridges in one call"
+    cmd = ['ovs-vsctl']
+    for bridge in sorted(bridges):
+        cmd += ['--', 'set', 'bridge', bridge, 'protocols=%s' % protocols,
+                'stp_enable=%s' % ('true' if stp else 'false')]
+    output = Popen(cmd, stdout=PIPE, stderr=STDOUT).communicate()[0]
+    if output.strip():
+        error('*** ovs-vsctl: %s\n' % output.decode('utf-8', 'replace'))
+
+
+def installFlows(net, topo, priority=PRIORITY, multipath=False, plan=None):
+    """Compute and install the shortest path rules of every switch, with
+       spanning tree off
+       multipath: ECMP select groups over all shortest next hops
+       plan: AddressPlan the hosts were addressed with (addrplan.py), for
+       one rule per pod or edge prefix
+       returns: number of rules installed"""
+    if not multipath:
+        flows = shortestPathFlows(net, topo, priority, plan)
+        protocols = None
+        configureBridges(flows, protocols='OpenFlow10')
+        failed = []
+    else:
+        flows, groups = multipathFlows(net, topo, priority, plan)
+        protocols = 'OpenFlow13'
+        configureBridges(flows)
+        info('*** Installing %d select groups\n' %
+             sum(len(lines) for lines in groups.values()))
+        failed = replaceGroups(groups, protocols)
+    total = sum(len(rules) for rules in flows.values())
+    info('*** Installing %d proactive flows in %d switches\n' %
+         (total, len(flows)))
+    failed += replaceFlows(dict((bridge, rules)
+                                for bridge, rules in flows.items()
+                                if bridge not in failed), protocols)
+    return total - sum(len(flows[bridge]) for bridge in set(failed))
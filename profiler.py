@@ -0,0 +1,137 @@
+"""
+Author: Brian Lebiednik
+
+Phase profiler for the perfTest lifecycle.
+
+The script marks where each phase begins (build, start, waitConnected,
+converge, test, teardown).  A sampling thread meanwhile reads, every
+interval seconds,
+
+    rss    resident memory of this python process (bytes)
+    fds    its open file descriptors (mininet keeps a pty per node)
+    procs  processes on the machine
+    mem    memory in use on the machine (bytes)
+    cpu    busy fraction of all CPUs since the previous sample
+    load   1 minute load average
+
+and tags every sample with the current phase.  write() emits the phase
+times, per phase peaks and means, and all samples as JSON.
+
+Usage
+    profiler = PhaseProfiler()
+    profiler.phase('build')
+    net = Mininet(topo=topo)
+    profiler.phase('start')
+    net.start()
+    ...
+    profiler.stop()
+    profiler.write('profile.json')
+"""
+
+import json
+import threading
+from time import time
+
+from sysstats import memoryUsed, processCount, rss, openFds, loadAverage
+from sysstats import cpuTimes
+
+COLUMNS = ('time', 'phase', 'rss', 'fds', 'procs', 'mem', 'cpu', 'load')
+
+
+class PhaseProfiler(threading.Thread):
+    "Samples resources in the background and splits them by phase"
+
+    def __init__(self, interval=0.5, label=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.label = label
+        self.phases = []
+        self.samples = []
+        self.current = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.lastCpu = cpuTimes()
+
+    def sample(self):
+        "Take one sample for the current phase"
+        busy, total = cpuTimes()
+        with self.lock:
+            lastBusy, lastTotal = self.lastCpu
+            self.lastCpu = busy, total
+            cpu = float(busy - lastBusy) / (total - lastTotal) \
+                if total > lastTotal else 0.0
+            self.samples.append((time(), self.current, rss(), openFds(),
+                                 processCount(), memoryUsed(), cpu,
+                                 loadAverage()))
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.sample()
+
+    def phase(self, name):
+        "End the current phase and begin phase name"
+        now = time()
+        with self.lock:
+            if self.phases:
+                self.phases[-1]['end'] = now
+            self.phases.append({'name': name, 'start': now, 'end': None})
+            self.current = name
+        # Every phase gets at least its first sample
+        self.sample()
+        if not self.is_alive() and not self.done.is_set():
+            self.start()
+
+    def stop(self):
+        "End the last phase and the sampling"
+        self.sample()
+        self.done.set()
+        with self.lock:
+            if self.phases and self.phases[-1]['end'] is None:
+                self.phases[-1]['end'] = time()
+            self.current = None
+
+    def durations(self):
+        "(phase, seconds) in order"
+        return [(p['name'], (p['end'] or time()) - p['start'])
+                for p in self.phases]
+
+    def summary(self):
+        "Phase list with seconds, sample count, peak and mean of each column"
+        with self.lock:
+            samples = list(self.samples)
+            phases = [dict(p) for p in self.phases]
+        for p in phases:
+            p['seconds'] = (p['end'] or time()) - p['start']
+            mine = [s for s in samples if s[1] == p['name']]
+            p['samples'] = len(mine)
+            p['peak'], p['mean'] = {}, {}
+            for i, column in enumerate(COLUMNS[2:], 2):
+                values = [s[i] for s in mine]
+                if values:
+                    p['peak'][column] = max(values)
+                    p['mean'][column] = sum(values) / float(len(values))
+        return phases
+
+    def report(self):
+        "One line per phase: seconds and peaks"
+        lines = []
+        for p in self.summary():
+            peak = p['peak']
+            lines.append('%-14s %8.3f s  rss %7.1f MB  fds %5s  procs %5s  '
+                         'cpu %3.0f%%' %
+                         (p['name'], p['seconds'],
+                          peak.get('rss', 0) / 1e6, peak.get('fds', '-'),
+                          peak.get('procs', '-'), 100 * peak.get('cpu', 0)))
+        return '\n'.join(lines)
+
+    def write(self, filename):
+        "Write the profile as JSON"
+        with self.lock:
+            samples = [list(s) for s in self.samples]
+        with open(filename, 'w') as f:
+            json.dump({'label': self.label,
+                       'interval': self.interval,
+                       'phases': self.summary(),
+                       'columns': list(COLUMNS),
+                       'samples': samples}, f, indent=1)
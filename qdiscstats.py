@@ -0,0 +1,424 @@
+"""
+Author: Brian Lebiednik
+
+Queue backlog and drop collector for the TCLink shaped interfaces.
+
+TCLink puts bw= in an htb (or tbf/hfsc) root qdisc and delay=/loss= in
+a netem qdisc below it, so a link queues and drops in those qdiscs.
+QdiscCollector opens one rtnetlink socket in every network namespace
+that owns a shaped interface (the root namespace, where the switch
+ports are, and each host) when it is created, and every interval
+seconds sends each socket the RTM_GETQDISC dump 'tc -s qdisc show'
+would send.  Polling starts no processes, so it does not compete with
+the emulation it measures; only without the rights to enter the
+namespaces does it fall back to one 'tc -s qdisc show' per namespace
+and poll.  Each qdisc is kept with its backlog (bytes and packets),
+drops, overlimits and bytes sent, tagged with the link direction its
+interface sends on.
+
+The samples carry absolute times, like the ping replies a Run keeps, so
+backlog on a link can be lined up with the RTT of the pairs crossing it:
+
+    queues = QdiscCollector(net, interval=1.0)
+    queues.start()
+    stats = pingTest(host, pairs, packetsize, seconds, outdir=run.dir,
+                     sink=run.addPing)
+    queues.stop()
+    queues.addTo(run)
+    store.select('backlog_bytes', src='s1', dst='s5')
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import socket
+import struct
+import threading
+from collections import namedtuple
+from subprocess import Popen, PIPE
+from time import time
+
+from mininet.log import error
+
+Qdisc = namedtuple('Qdisc', 'dev kind handle parent sent packets drops '
+                   'overlimits backlog qlen')
+
+QueueSummary = namedtuple('QueueSummary', 'src dst dev kind peakBacklog '
+                          'meanBacklog peakQlen drops')
+
+SHAPING = ('bw', 'delay', 'jitter', 'loss', 'max_queue_size')
+
+_head = re.compile(r'^qdisc (\S+) (\S+) dev (\S+) (?:parent (\S+)|root)')
+_sent = re.compile(r'Sent (\d+) bytes (\d+) pkt \(dropped (\d+), '
+                   r'overlimits (\d+)')
+_backlog = re.compile(r'backlog (\d+)([KMG]?)b (\d+)p')
+_units = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+NETLINK_ROUTE = 0
+NLM_F_REQUEST, NLM_F_DUMP = 0x1, 0x300
+NLMSG_ERROR, NLMSG_DONE = 2, 3
+RTM_NEWLINK, RTM_GETLINK = 16, 18
+RTM_NEWQDISC, RTM_GETQDISC = 36, 38
+IFLA_IFNAME = 3
+TCA_KIND, TCA_STATS2 = 1, 7
+TCA_STATS_BASIC, TCA_STATS_QUEUE = 1, 3
+TC_H_ROOT = 0xFFFFFFFF
+CLONE_NEWNET = 0x40000000
+# gettid() for Pythons without threading.get_native_id()
+SYS_GETTID = {'x86_64': 186, 'aarch64': 178, 'i386': 224, 'i686': 224,
+              'armv7l': 224, 'ppc64le': 207}
+_nlmsghdr = struct.Struct('=IHHII')
+_ifinfomsg = struct.Struct('=BxHiII')
+_tcmsg = struct.Struct('=BxxxiIII')
+_rtattr = struct.Struct('=HH')
+_basic = struct.Struct('=QI')
+_queue = struct.Struct('=IIIII')
+
+_libc = None
+
+
+def parseQdiscs(text):
+    "Qdisc for every qdisc in 'tc -s qdisc show' output"
+    qdiscs, current = [], None
+    for line in text.split('\n'):
+        head = _head.match(line)
+        if head:
+            kind, handle, dev, parent = head.groups()
+            current = dict(dev=dev, kind=kind, handle=handle,
+                           parent=parent or 'root', sent=0, packets=0,
+                           drops=0, overlimits=0, backlog=0, qlen=0)
+            qdiscs.append(current)
+            continue
+        if current is None:
+            continue
+        sent = _sent.search(line)
+        if sent:
+            current['sent'], current['packets'], current['drops'], \
+                current['overlimits'] = [int(v) for v in sent.groups()]
+        backlog = _backlog.search(line)
+        if backlog:
+            size, unit, packets = backlog.groups()
+            current['backlog'] = int(size) * _units[unit]
+            current['qlen'] = int(packets)
+    return [Qdisc(**q) for q in qdiscs]
+
+
+def _setns():
+    "libc with setns(), or None"
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                               use_errno=True)
+            libc.setns
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+def _threadId():
+    "Kernel id of the calling thread"
+    native = getattr(threading, 'get_native_id', None)
+    if native is not None:
+        return native()
+    number = SYS_GETTID.get(os.uname()[4])
+    if number is None:
+        # Right for the main thread, where the collector is made
+        return os.getpid()
+    return _setns().syscall(number)
+
+
+def _ownNamespace():
+    "Path of the network namespace of the calling thread"
+    if os.path.exists('/proc/thread-self'):
+        return '/proc/thread-self/ns/net'
+    # /proc/thread-self is new in Linux 3.17
+    return '/proc/self/task/%d/ns/net' % _threadId()
+
+
+def _enter(path):
+    "Move this thread into the network namespace at path"
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if _setns().setns(fd, CLONE_NEWNET) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, 'setns %s: %s' % (path, os.strerror(err)))
+    finally:
+        os.close(fd)
+
+
+def _attrs(data, offset, end):
+    "(type, payload) of the rtattrs in data[offset:end]"
+    while offset + _rtattr.size <= end:
+        length, kind = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        yield kind & 0x3FFF, data[offset + _rtattr.size:offset + length]
+        offset += (length + 3) & ~3
+
+
+def _handle(value):
+    "A tc handle the way tc prints it"
+    major, minor = value >> 16, value & 0xFFFF
+    if value == TC_H_ROOT:
+        return 'root'
+    if minor == 0:
+        return '%x:' % major
+    if major == 0:
+        return ':%x' % minor
+    return '%x:%x' % (major, minor)
+
+
+class QdiscReader(object):
+    "rtnetlink socket in the network namespace of a node"
+
+    def __init__(self, node=None):
+        """node: Mininet node whose namespace to read, None for the root
+           namespace; entering one needs CAP_SYS_ADMIN
+           raises: OSError if the namespace cannot be read, RuntimeError
+           if this thread cannot get back to its own namespace"""
+        own = None
+        try:
+            if node is not None:
+                if _setns() is None:
+                    raise OSError('setns() is not available')
+                own = os.open(_ownNamespace(), os.O_RDONLY)
+                _enter('/proc/%d/ns/net' % node.pid)
+            # The socket stays in the namespace it was created in
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                      NETLINK_ROUTE)
+        finally:
+            if own is not None:
+                try:
+                    if _setns().setns(own, CLONE_NEWNET) != 0:
+                        # Everything this thread ran next would run in
+                        # the node's namespace; no tc fallback for that
+                        err = ctypes.get_errno()
+                        raise RuntimeError('setns back from %s failed: %s'
+                                           % (node.name, os.strerror(err)))
+                finally:
+                    os.close(own)
+        self.sock.bind((0, 0))
+        self.seq = 0
+        self.names = self.links()
+
+    def request(self, kind, body):
+        "Send a dump request; returns (type, body) of every reply"
+        self.seq += 1
+        self.sock.send(_nlmsghdr.pack(_nlmsghdr.size + len(body), kind,
+                                      NLM_F_REQUEST | NLM_F_DUMP, self.seq,
+                                      0) + body)
+        replies = []
+        while True:
+            data = self.sock.recv(1 << 17)
+            offset = 0
+            while offset + _nlmsghdr.size <= len(data):
+                length, msgType, _flags, seq, _pid = \
+                    _nlmsghdr.unpack_from(data, offset)
+                if length < _nlmsghdr.size:
+                    return replies
+                body = data[offset + _nlmsghdr.size:offset + length]
+                offset += (length + 3) & ~3
+                if seq != self.seq:
+                    continue
+                if msgType == NLMSG_DONE:
+                    return replies
+                if msgType == NLMSG_ERROR:
+                    err = -struct.unpack_from('=i', body)[0]
+                    if err:
+                        raise OSError(err, 'rtnetlink: %s' % os.strerror(err))
+                    return replies
+                replies.append((msgType, body))
+
+    def links(self):
+        "{ifindex: interface name} of the namespace"
+        names = {}
+        for msgType, body in self.request(RTM_GETLINK,
+                                          _ifinfomsg.pack(0, 0, 0, 0, 0)):
+            if msgType != RTM_NEWLINK:
+                continue
+            index = _ifinfomsg.unpack_from(body)[2]
+            for kind, value in _attrs(body, _ifinfomsg.size, len(body)):
+                if kind == IFLA_IFNAME:
+                    names[index] = value.rstrip(b'\0').decode('utf-8')
+        return names
+
+    def qdiscs(self):
+        "Qdisc for every qdisc of the namespace, as in 'tc -s qdisc show'"
+        found = []
+        for msgType, body in self.request(RTM_GETQDISC,
+                                          _tcmsg.pack(0, 0, 0, 0, 0)):
+            if msgType != RTM_NEWQDISC:
+                continue
+            _family, index, handle, parent, _info = _tcmsg.unpack_from(body)
+            if index not in self.names:
+                self.names = self.links()
+            q = dict(dev=self.names.get(index, str(index)), kind='',
+                     handle=_handle(handle), parent=_handle(parent), sent=0,
+                     packets=0, drops=0, overlimits=0, backlog=0, qlen=0)
+            for kind, value in _attrs(body, _tcmsg.size, len(body)):
+                if kind == TCA_KIND:
+                    q['kind'] = value.rstrip(b'\0').decode('utf-8')
+                elif kind == TCA_STATS2:
+                    for stat, data in _attrs(value, 0, len(value)):
+                        if stat == TCA_STATS_BASIC:
+                            q['sent'], q['packets'] = \
+                                _basic.unpack_from(data)
+                        elif stat == TCA_STATS_QUEUE:
+                            q['qlen'], q['backlog'], q['drops'], \
+                                _requeues, q['overlimits'] = \
+                                _queue.unpack_from(data)
+            found.append(Qdisc(**q))
+        return found
+
+    def close(self):
+        self.sock.close()
+
+
+def shapedIntfs(net):
+    """Interfaces of the TCLinks, grouped by namespace
+       returns: {node owning the namespace, None for the root:
+       {interface: (sending node, receiving node)}}"""
+    spaces = {}
+    for link in net.links:
+        for intf, other in ((link.intf1, link.intf2),
+                            (link.intf2, link.intf1)):
+            if not any(intf.params.get(p) for p in SHAPING):
+                continue
+            node = intf.node if intf.node.inNamespace else None
+            spaces.setdefault(node, {})[intf.name] = (intf.node.name,
+                                                      other.node.name)
+    return spaces
+
+
+class QdiscCollector(threading.Thread):
+    "Polls the qdisc counters of every shaped interface in the background"
+
+    def __init__(self, net, interval=1.0):
+        """net: Mininet
+           interval: seconds between polls"""
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.spaces = shapedIntfs(net)
+        self.samples = []
+        self.done = threading.Event()
+        self.readers = {}
+        try:
+            for node in self.spaces:
+                self.readers[node] = QdiscReader(node)
+        except (OSError, IOError, socket.error) as e:
+            error('*** No rtnetlink in the namespaces (%s), polling with '
+                  'tc\n' % e)
+            self.close()
+
+    def close(self):
+        "Close the rtnetlink sockets"
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+
+    def dump(self, node):
+        "Start the tc dump of one namespace"
+        cmd = ['tc', '-s', 'qdisc', 'show']
+        if node is None:
+            return Popen(cmd, stdout=PIPE, stderr=PIPE)
+        return node.popen(cmd, stdout=PIPE, stderr=PIPE)
+
+    def poll(self):
+        "(node, list of Qdisc) of every namespace"
+        if self.readers:
+            return [(node, reader.qdiscs())
+                    for node, reader in self.readers.items()]
+        running = [(node, self.dump(node)) for node in self.spaces]
+        return [(node, parseQdiscs(proc.communicate()[0].decode(
+            'utf-8', 'replace'))) for node, proc in running]
+
+    def sample(self):
+        "Poll every namespace once"
+        now = time()
+        for node, qdiscs in self.poll():
+            intfs = self.spaces[node]
+            for q in qdiscs:
+                if q.dev in intfs:
+                    src, dst = intfs[q.dev]
+                    self.samples.append((now, src, dst, q))
+
+    def run(self):
+        self.sample()
+        deadline = time()
+        while True:
+            deadline += self.interval
+            if self.done.wait(max(0, deadline - time())):
+                break
+            self.sample()
+        self.sample()
+
+    def stop(self):
+        "Stop polling and wait for the last poll"
+        self.done.set()
+        self.join()
+        self.close()
+
+    def rootSamples(self):
+        """(time, src, dst, Qdisc) of the root qdiscs only; their counters
+           include the qdiscs below them"""
+        return [s for s in self.samples if s[3].parent == 'root']
+
+    def summary(self):
+        "QueueSummary of every link direction, most drops first"
+        series = {}
+        for _now, src, dst, q in self.rootSamples():
+            series.setdefault((src, dst), []).append(q)
+        summaries = []
+        for (src, dst), qdiscs in series.items():
+            backlogs = [q.backlog for q in qdiscs]
+            summaries.append(QueueSummary(
+                src, dst, qdiscs[0].dev, qdiscs[0].kind, max(backlogs),
+                float(sum(backlogs)) / len(backlogs),
+                max(q.qlen for q in qdiscs),
+                qdiscs[-1].drops - qdiscs[0].drops))
+        summaries.sort(key=lambda s: (-s.drops, -s.peakBacklog, s.src, s.dst))
+        return summaries
+
+    def report(self, top=5):
+        "One line per link direction with the most drops and backlog"
+        lines = []
+        for s in self.summary()[:top]:
+            lines.append('%-24s %-5s drops %6d  backlog peak %8d B '
+                         'mean %10.1f B  qlen peak %4d' %
+                         ('%s->%s' % (s.src, s.dst), s.kind, s.drops,
+                          s.peakBacklog, s.meanBacklog, s.peakQlen))
+        return '\n'.join(lines)
+
+    def write(self, filename):
+        "Every qdisc of every poll, one row each"
+        with open(filename, 'w') as f:
+            f.write('time\tsrc\tdst\tdev\tqdisc\thandle\tparent\tbacklog'
+                    '\tqlen\tdrops\toverlimits\tsent\n')
+            for now, src, dst, q in self.samples:
+                f.write('%.4f\t%s\t%s\t%s\t%s\t%s\t%s\t%d\t%d\t%d\t%d\t%d\n'
+                        % (now, src, dst, q.dev, q.kind, q.handle, q.parent,
+                           q.backlog, q.qlen, q.drops, q.overlimits,
+                           q.sent))
+
+    def writeSummary(self, filename):
+        "One row per link direction, most drops first"
+        with open(filename, 'w') as f:
+            f.write('src\tdst\tdev\tqdisc\tpeakBacklog\tmeanBacklog'
+                    '\tpeakQlen\tdrops\n')
+            for s in self.summary():
+                f.write('%s\t%s\t%s\t%s\t%d\t%.1f\t%d\t%d\n' % s)
+
+    def addTo(self, run):
+        """Write qdiscs.txt and queues.txt into a results Run and add the
+           backlog and drops of every root qdisc poll, at the poll time"""
+        self.write(run.path('qdiscs.txt'))
+        self.writeSummary(run.path('queues.txt'))
+        first = {}
+        for now, src, dst, q in self.rootSamples():
+            base = first.setdefault((src, dst), q.drops)
+            run.add(src, dst, 'backlog_bytes', q.backlog, now)
+            run.add(src, dst, 'qdisc_drops', q.drops - base, now)
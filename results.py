@@ -0,0 +1,322 @@
+"""
+Author: Brian Lebiednik
+
+Columnar results store.
+
+Every test run gets a run id and a directory under the store.  Its
+samples (pair, metric, timestamp, value) are appended to one binary
+file per column, and everything that is the same for the whole run
+(topology, host count, packet size, other parameters) is kept once in
+index.json.  Strings such as host and metric names are stored as codes
+into strings.txt, which only ever grows.
+
+    results/index.json            runs and their parameters
+    results/strings.txt           string dictionary, one per line
+    results/run-<id>/time.d       timestamps (array 'd')
+    results/run-<id>/src.i        source names (string codes, array 'i')
+    results/run-<id>/dst.i        destination names
+    results/run-<id>/metric.i     metric names
+    results/run-<id>/value.d      values
+
+A read first filters runs on the index and then loads only the columns
+it needs, so scanning hundreds of runs for one metric stays fast.
+
+Usage
+    store = ResultStore('results')
+    run = store.newRun('FatTreeTopo', hosts=16, packetsize=54)
+    run.add('h0', 'h1', 'rtt', 0.12)
+    run.close()
+    print store.curve('rtt', topo='FatTreeTopo')
+"""
+
+import fcntl
+import json
+import os
+import sys
+from array import array
+from collections import namedtuple
+from time import time
+
+Sample = namedtuple('Sample',
+                    'run topo hosts packetsize src dst metric time value')
+
+STORE_VERSION = 1
+
+# Column name -> array typecode; the file name is '<name>.<typecode>'
+COLUMNS = (('time', 'd'), ('src', 'i'), ('dst', 'i'), ('metric', 'i'),
+           ('value', 'd'))
+
+
+class _Locked(object):
+    "Exclusive lock on the store while the index and strings change"
+
+    def __init__(self, root):
+        self.path = os.path.join(root, '.lock')
+
+    def __enter__(self):
+        self.f = open(self.path, 'a')
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+
+class ResultStore(object):
+    "Runs and their samples under one directory"
+
+    def __init__(self, root=None):
+        "root: store directory, default $RESULTS_DIR or ./results"
+        if root is None:
+            root = os.environ.get('RESULTS_DIR', 'results')
+        self.root = root
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        self.strings = []
+        self.codes = {}
+
+    # Index and string dictionary
+
+    def _indexPath(self):
+        return os.path.join(self.root, 'index.json')
+
+    def index(self):
+        "The index: {'version', 'byteorder', 'runs': [run dicts]}"
+        try:
+            with open(self._indexPath()) as f:
+                index = json.load(f)
+        except IOError:
+            return {'version': STORE_VERSION, 'byteorder': sys.byteorder,
+                    'runs': []}
+        if index.get('version') != STORE_VERSION:
+            raise ValueError('results index version %s, expected %s' %
+                             (index.get('version'), STORE_VERSION))
+        return index
+
+    def _writeIndex(self, index):
+        tmp = self._indexPath() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.rename(tmp, self._indexPath())
+
+    def _loadStrings(self):
+        "Read strings added by other writers since the last call"
+        path = os.path.join(self.root, 'strings.txt')
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            lines = f.read().split('\n')[:-1]
+        for text in lines[len(self.strings):]:
+            self.codes[text] = len(self.strings)
+            self.strings.append(text)
+
+    def encode(self, texts):
+        "Codes for texts, adding the new ones to the string dictionary"
+        texts = [str(text) for text in texts]
+        if all(text in self.codes for text in texts):
+            return [self.codes[text] for text in texts]
+        with _Locked(self.root):
+            self._loadStrings()
+            new = []
+            for text in texts:
+                if text not in self.codes:
+                    if '\n' in text:
+                        raise ValueError('no newlines in stored strings')
+                    self.codes[text] = len(self.strings)
+                    self.strings.append(text)
+                    new.append(text)
+            if new:
+                with open(os.path.join(self.root, 'strings.txt'), 'a') as f:
+                    f.write(''.join(text + '\n' for text in new))
+        return [self.codes[text] for text in texts]
+
+    def code(self, text):
+        "Code of a known string, -1 when it was never stored"
+        if str(text) not in self.codes:
+            self._loadStrings()
+        return self.codes.get(str(text), -1)
+
+    def decode(self, code):
+        if code >= len(self.strings):
+            self._loadStrings()
+        return self.strings[code]
+
+    # Writing
+
+    def newRun(self, topo, hosts=None, packetsize=None, **params):
+        """Start a run
+           topo: topology name, e.g. the test variable of perfTest()
+           hosts, packetsize: host count and ping packet size, if any
+           params: anything else worth filtering on (pattern, seconds)
+           returns: Run to add samples to"""
+        with _Locked(self.root):
+            index = self.index()
+            runId = max([r['run'] for r in index['runs']] + [0]) + 1
+            entry = {'run': runId, 'topo': topo, 'hosts': hosts,
+                     'packetsize': packetsize, 'params': params,
+                     'start': time(), 'rows': 0,
+                     'dir': 'run-%d' % runId}
+            index['runs'].append(entry)
+            self._writeIndex(index)
+        os.makedirs(os.path.join(self.root, entry['dir']))
+        return Run(self, entry)
+
+    def _finishRun(self, entry):
+        with _Locked(self.root):
+            index = self.index()
+            for known in index['runs']:
+                if known['run'] == entry['run']:
+                    known.update(rows=entry['rows'], end=entry.get('end'))
+            self._writeIndex(index)
+
+    # Reading
+
+    def runs(self, topo=None, hosts=None, packetsize=None, **params):
+        "Index entries of the runs matching every given value"
+        wanted = {'topo': topo, 'hosts': hosts, 'packetsize': packetsize}
+        found = []
+        for entry in self.index()['runs']:
+            if any(value is not None and entry.get(key) != value
+                   for key, value in wanted.items()):
+                continue
+            if any(entry['params'].get(key) != value
+                   for key, value in params.items()):
+                continue
+            found.append(entry)
+        return found
+
+    def _column(self, entry, name, typecode, swap):
+        column = array(typecode)
+        path = os.path.join(self.root, entry['dir'],
+                            '%s.%s' % (name, typecode))
+        if os.path.exists(path):
+            count = os.path.getsize(path) // column.itemsize
+            # A run still being written may have more rows than the index
+            if entry['rows']:
+                count = min(count, entry['rows'])
+            with open(path, 'rb') as f:
+                column.fromfile(f, count)
+        if swap:
+            column.byteswap()
+        return column
+
+    def columns(self, entry, names=None):
+        """Columns of one run as arrays; the string columns stay codes
+           names: columns to load, default all"""
+        swap = self.index()['byteorder'] != sys.byteorder
+        return dict((name, self._column(entry, name, typecode, swap))
+                    for name, typecode in COLUMNS
+                    if names is None or name in names)
+
+    def select(self, metric=None, src=None, dst=None, topo=None, hosts=None,
+               packetsize=None, **params):
+        "Samples of the matching runs, with src, dst and metric decoded"
+        samples = []
+        metricCode = self.code(metric) if metric is not None else None
+        srcCode = self.code(src) if src is not None else None
+        dstCode = self.code(dst) if dst is not None else None
+        for entry in self.runs(topo, hosts, packetsize, **params):
+            cols = self.columns(entry)
+            for i in range(len(cols['value'])):
+                if metricCode is not None and cols['metric'][i] != metricCode:
+                    continue
+                if srcCode is not None and cols['src'][i] != srcCode:
+                    continue
+                if dstCode is not None and cols['dst'][i] != dstCode:
+                    continue
+                samples.append(Sample(entry['run'], entry['topo'],
+                                      entry['hosts'], entry['packetsize'],
+                                      self.decode(cols['src'][i]),
+                                      self.decode(cols['dst'][i]),
+                                      self.decode(cols['metric'][i]),
+                                      cols['time'][i], cols['value'][i]))
+        return samples
+
+    def values(self, metric, **filters):
+        """All values of one metric per matching run, read straight from
+           the metric and value columns
+           returns: {run id: array of values}"""
+        code = self.code(metric)
+        found = {}
+        for entry in self.runs(**filters):
+            cols = self.columns(entry, ('metric', 'value'))
+            found[entry['run']] = array('d', (
+                value for m, value in zip(cols['metric'], cols['value'])
+                if m == code))
+        return found
+
+    def curve(self, metric, x='hosts', **filters):
+        """Scaling curve of a metric: its mean for every value of the run
+           field x ('hosts', 'packetsize' or a params key)
+           returns: sorted list of (x, mean, samples, runs)"""
+        runs = dict((entry['run'], entry) for entry in self.runs(**filters))
+        points = {}
+        for runId, values in self.values(metric, **filters).items():
+            entry = runs[runId]
+            key = entry[x] if x in entry else entry['params'].get(x)
+            total, count, seen = points.get(key, (0.0, 0, 0))
+            points[key] = (total + sum(values), count + len(values),
+                           seen + 1)
+        return [(key, total / count if count else None, count, seen)
+                for key, (total, count, seen) in sorted(points.items())]
+
+
+class Run(object):
+    "Column buffers of one run, appended to its files on flush()"
+
+    def __init__(self, store, entry, flushEvery=4096):
+        self.store = store
+        self.entry = entry
+        self.dir = os.path.join(store.root, entry['dir'])
+        self.flushEvery = flushEvery
+        self.buffers = dict((name, array(typecode))
+                            for name, typecode in COLUMNS)
+
+    def path(self, filename):
+        "Path for a raw output file kept with the run"
+        return os.path.join(self.dir, filename)
+
+    def add(self, src, dst, metric, value, timestamp=None):
+        "Append one sample"
+        codes = self.store.encode([src, dst, metric])
+        buffers = self.buffers
+        buffers['time'].append(time() if timestamp is None else timestamp)
+        buffers['src'].append(codes[0])
+        buffers['dst'].append(codes[1])
+        buffers['metric'].append(codes[2])
+        buffers['value'].append(float(value))
+        if len(buffers['value']) >= self.flushEvery:
+            self.flush()
+
+    def addPing(self, record):
+        "Sink for pingTest(): 'rtt' in ms, or 'error' for error replies"
+        if record.rtt is None:
+            self.add(record.src, record.dst, 'error', 1)
+        else:
+            self.add(record.src, record.dst, 'rtt', record.rtt)
+
+    def addFlows(self, results, metric='mbps'):
+        "One sample per FlowResult (or FlowPrediction) with a rate"
+        for r in results:
+            bps = getattr(r, 'bps', None)
+            mbps = bps / 1e6 if bps is not None else getattr(r, 'mbps', None)
+            if mbps is not None:
+                self.add(r.src, r.dst, metric, mbps,
+                         getattr(r, 'end', None))
+
+    def flush(self):
+        count = len(self.buffers['value'])
+        if not count:
+            return
+        for name, typecode in COLUMNS:
+            with open(self.path('%s.%s' % (name, typecode)), 'ab') as f:
+                self.buffers[name].tofile(f)
+            self.buffers[name] = array(typecode)
+        self.entry['rows'] += count
+
+    def close(self):
+        "Flush and record the row count in the index"
+        self.flush()
+        self.entry['end'] = time()
+        self.store._finishRun(self.entry)
@@ -0,0 +1,233 @@
+"""
+Author: Brian Lebiednik
+
+Layer 3 routed mode: the switches of a Topo become Linux routers.
+
+Passing switch=LinuxRouter (and controller=None) to Mininet builds every
+switch of the topology as a namespace with IP forwarding on, so the same
+Topo classes can compare kernel L3 forwarding with the OVS L2 switches.
+installRoutes() then
+
+    gives every link its own /30 from linkBase, .1 on the first node and
+    .2 on the second; a host's address is the one on its link
+    routes, on every router, the subnet of each host link over its
+    shortest next hop, or over all of them (ECMP, one nexthop per path)
+    with multipath=True
+    with an AddressPlan instead gives each host its plan address and
+    its edge router the 10.pod.edge.254 gateway, both as /32s, and
+    routes whole pod or edge prefixes wherever their hosts share the
+    next hops
+    points the default route of every host at its router
+
+and writes each namespace's addresses and routes with a single
+'ip -batch', all namespaces at the same time.
+
+    net = Mininet(topo=topo, switch=LinuxRouter, controller=None,
+                  link=TCLink)
+    net.start()
+    installRoutes(net, topo, multipath=True)
+
+There is no controller to connect to, so skip net.waitConnected().
+"""
+
+import socket
+import struct
+from subprocess import PIPE, STDOUT
+
+from mininet.log import info, error
+from mininet.node import Node
+
+from fairshare import hopsTo, nextHops
+from topostats import topoGraph
+
+
+class LinuxRouter(Node):
+    """Custom Linux router for Layer 3 routing, usable as Mininet's switch
+       class: always in its own namespace, started and stopped like a
+       switch"""
+
+    def __init__(self, name, inNamespace=True, **params):
+        Node.__init__(self, name, inNamespace=True, **params)
+
+    def forward(self):
+        "Turn on forwarding in the router's namespace"
+        # No reverse path check, ECMP return paths may differ (the check
+        # uses the larger of 'all' and the interface's own value); hash
+        # flows on their L4 ports over the nexthops.  Proxy ARP as in the
+        # old per script routers, for hosts that ARP for off-link
+        # addresses instead of using their gateway
+        self.cmd('sysctl -w net.ipv4.ip_forward=1 '
+                 'net.ipv4.conf.all.proxy_arp=1 '
+                 'net.ipv4.conf.all.rp_filter=0 '
+                 'net.ipv4.conf.default.rp_filter=0 ' +
+                 ''.join('net.ipv4.conf.%s.rp_filter=0 ' % name
+                         for name in self.intfNames() if name != 'lo') +
+                 'net.ipv4.fib_multipath_hash_policy=1')
+
+    def config(self, **params):
+        "Added with addHost(), Mininet configures the router like a host"
+        super(LinuxRouter, self).config(**params)
+        self.forward()
+
+    def start(self, controllers):
+        """Used as the switch class, Mininet never calls config(); the
+           kernel forwards once the sysctls are set"""
+        self.forward()
+
+    def stop(self, deleteIntfs=True):
+        if deleteIntfs:
+            self.deleteIntfs()
+
+    def connected(self):
+        return True
+
+    def terminate(self):
+        self.cmd('sysctl -w net.ipv4.ip_forward=0 '
+                 'net.ipv4.conf.all.proxy_arp=0')
+        super(LinuxRouter, self).terminate()
+
+
+def _ip(value):
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def linkSubnets(net, linkBase='172.16.0.0/12'):
+    """Give every link a /30 out of linkBase, .1 to intf1 and .2 to intf2;
+       the interfaces' ip and prefixLen are updated to match
+       returns: {(node, neighbour): (interface, own IP, neighbour IP,
+       subnet)} for the first link between each pair of nodes"""
+    base, bits = linkBase.split('/')
+    start = struct.unpack('!I', socket.inet_aton(base))[0]
+    if 4 * len(net.links) > 1 << (32 - int(bits)):
+        raise ValueError('%d links do not fit in %s' %
+                         (len(net.links), linkBase))
+    addrs = {}
+    for i, link in enumerate(net.links):
+        subnet = '%s/30' % _ip(start + 4 * i)
+        ip1, ip2 = _ip(start + 4 * i + 1), _ip(start + 4 * i + 2)
+        for intf, other, mine, theirs in ((link.intf1, link.intf2, ip1, ip2),
+                                          (link.intf2, link.intf1, ip2, ip1)):
+            intf.ip, intf.prefixLen = mine, 30
+            key = (intf.node.name, other.node.name)
+            if key not in addrs:
+                addrs[key] = (intf.name, mine, theirs, subnet)
+    return addrs
+
+
+def _hostLink(lines, intf, other, plan):
+    """Plan addresses of a host link: the host's own /32 and the gateway
+       /32 on the router side, each with a route to the other end"""
+    if intf.node.name in plan.hosts:
+        intf.ip, peer = plan.ip(intf.node.name), plan.gateway(intf.node.name)
+    else:
+        intf.ip, peer = plan.gateway(other.node.name), plan.ip(other.node.name)
+    intf.prefixLen = 32
+    lines.append('addr add %s/32 dev %s' % (intf.ip, intf.name))
+    lines.append('route replace %s dev %s' % (peer, intf.name))
+
+
+def routedBatches(net, topo, addrs, multipath=False, plan=None):
+    """ip -batch lines of every node: its link addresses, the routes of a
+       router towards every host subnet, the default route of a host
+       plan: AddressPlan, for host addresses from the plan and one route
+       per pod or edge prefix where possible
+       returns: {node name: list of lines}"""
+    graph = topoGraph(topo)
+    names, targets = graph.names, graph.targets
+    batches = {}
+    for link in net.links:
+        for intf, other in ((link.intf1, link.intf2),
+                            (link.intf2, link.intf1)):
+            lines = batches.setdefault(intf.node.name, [])
+            lines.append('addr flush dev %s' % intf.name)
+            if plan is not None and (intf.node.name in plan.hosts or
+                                     other.node.name in plan.hosts):
+                _hostLink(lines, intf, other, plan)
+            else:
+                lines.append('addr add %s/%d dev %s' %
+                             (intf.ip, intf.prefixLen, intf.name))
+    actions = {}
+    subnets = {}
+    for dst, name in enumerate(names):
+        if graph.switch[dst]:
+            continue
+        dist = hopsTo(graph, dst)
+        subnet = None
+        for v, hops in enumerate(dist):
+            if hops == 1 and graph.switch[v]:
+                _intf, _mine, gateway, subnet = addrs[(name, names[v])]
+                if plan is not None:
+                    gateway = plan.gateway(name)
+                batches[name].append('route replace default via %s' %
+                                     gateway)
+                break
+        if subnet is None:
+            continue
+        subnets[name] = subnet
+        for v, hops in enumerate(dist):
+            if hops <= 1 or not graph.switch[v]:
+                continue
+            down = nextHops(graph, dist, v, dst)
+            if not multipath:
+                down = down[:1]
+            via = []
+            for e in down:
+                intf, _mine, gateway, _subnet = addrs[(names[v],
+                                                       names[targets[e]])]
+                hop = 'via %s dev %s' % (gateway, intf)
+                if hop not in via:
+                    via.append(hop)
+            if len(via) == 1:
+                route = via[0]
+            else:
+                route = ' '.join('nexthop ' + hop for hop in via)
+            actions.setdefault(names[v], {})[name] = route
+    for router, byHost in actions.items():
+        if plan is None:
+            entries = [(subnets[host], byHost[host])
+                       for host in sorted(byHost)]
+        else:
+            entries = [(plan.ipPrefix(level, key), route)
+                       for level, key, route in plan.aggregate(byHost)]
+        batches[router] += ['route replace %s %s' % entry
+                            for entry in entries]
+    return batches
+
+
+def runBatches(net, batches):
+    """Run every node's lines with one 'ip -force -batch -' in its
+       namespace, all nodes in parallel
+       returns: nodes whose batch failed"""
+    running = []
+    for name in sorted(batches):
+        proc = net.get(name).popen(['ip', '-force', '-batch', '-'],
+                                   stdin=PIPE, stdout=PIPE, stderr=STDOUT)
+        proc.stdin.write(('\n'.join(batches[name]) + '\n').encode('utf-8'))
+        proc.stdin.close()
+        running.append((name, proc))
+    failed = []
+    for name, proc in running:
+        output = proc.stdout.read()
+        proc.wait()
+        if proc.returncode:
+            error('*** %s ip batch: %s\n' %
+                  (name, output.decode('utf-8', 'replace').strip()))
+            failed.append(name)
+    return failed
+
+
+def installRoutes(net, topo, linkBase='172.16.0.0/12', multipath=False,
+                  plan=None):
+    """Address every link and install the shortest path routes
+       multipath: ECMP routes over all shortest next hops
+       plan: AddressPlan the hosts were addressed with (addrplan.py), for
+       one route per pod or edge prefix
+       returns: number of routes installed"""
+    addrs = linkSubnets(net, linkBase)
+    batches = routedBatches(net, topo, addrs, multipath, plan)
+    routes = dict((name, sum(1 for line in lines if line.startswith('route')))
+                  for name, lines in batches.items())
+    info('*** Installing %d routes in %d namespaces\n' %
+         (sum(routes.values()), len(batches)))
+    failed = runBatches(net, batches)
+    return sum(routes.values()) - sum(routes[name] for name in failed)
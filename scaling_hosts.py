@@ -7,15 +7,26 @@ from mininet.node import CPULimitedHost
 from mininet.link import TCLink
 from mininet.util import dumpNodeConnections
 from mininet.log import setLogLevel
-from mininet.node import RemoteController
 from mininet.node import Controller
 from mininet.cli import CLI
 import os
+import sys
 import time
-import thread
 from time import time, sleep
-from select import poll, POLLIN
-from subprocess import Popen, PIPE
+from convergence import waitConverged
+from netoptions import netOptions, routingFor, buildNet, startNet, connectNet
+from teardown import teardown
+from experiments import pingTest
+from flows import runIperfFlows, flowSummary, writeFlows
+from fairshare import predictRates, compareFlows, writeComparison
+from results import ResultStore
+from profiler import PhaseProfiler
+from linkstats import LinkSampler
+from qdiscstats import QdiscCollector
+from sysstats import memoryUsed, processCount
+from traffic import topoPairs, uniquePairs
+from topogen import KaryFatTreeTopo, RecursiveDcellTopo
+from topogen import FacebookFabricTopo
 
 """
 Author: Brian Lebiednik
@@ -27,58 +38,28 @@ Requires a custom controller with the command as follows on xterm1
 
 
 Usage
-sudo python performancetest.py
+sudo python scaling_hosts.py
+sudo python scaling_hosts.py sweep [topology] [max hosts per edge]
+
+The sweep grows the hosts per edge switch 1, 2, 4, ... and writes the build
+time, start time, memory, process count and RTT of every step to
+scaling_sweep.txt (see sweep())
 
 Currently you can change the following line to change the topology that the program runs
 
 topo = {}(n=4)
-{DcellNoLoop, FacebookNoLoop, FatTreeTopoNoLoop}
+{DcellNoLoop, FacebookNoLoop, FatTreeTopoNoLoop, KaryFatTreeTopo,
+ RecursiveDcellTopo, FacebookFabricTopo}
 
-To kill a mininet process running in the background issue a 'sudo mn -c'
+To kill a mininet process running in the background issue a
+'sudo python teardown.py' (or the slower 'sudo mn -c')
 
 
 """
 
-def iperf_thread(net, src, dst):
-    host_pair = [src, dst]
-    bandwidth = net.iperf(host_pair, seconds = 5)
-
-def monitorFiles( outfiles, seconds, timeoutms ):
-    "Monitor set of files and return [(host, line)...]"
-    devnull = open( '/dev/null', 'w' )
-    tails, fdToFile, fdToHost = {}, {}, {}
-    for h, outfile in outfiles.iteritems():
-        tail = Popen( [ 'tail', '-f', outfile ],
-                      stdout=PIPE, stderr=devnull )
-        fd = tail.stdout.fileno()
-        tails[ h ] = tail
-        fdToFile[ fd ] = tail.stdout
-        fdToHost[ fd ] = h
-    # Prepare to poll output files
-    readable = poll()
-    for t in tails.values():
-        readable.register( t.stdout.fileno(), POLLIN )
-    # Run until a set number of seconds have elapsed
-    endTime = time() + seconds
-    while time() < endTime:
-        fdlist = readable.poll(timeoutms)
-        if fdlist:
-            for fd, _flags in fdlist:
-                f = fdToFile[ fd ]
-                host = fdToHost[ fd ]
-                # Wait for a line of output
-                line = f.readline().strip()
-                yield host, line
-        else:
-            # If we timed out, return nothing
-            yield None, ''
-    for t in tails.values():
-        t.terminate()
-    devnull.close()  # Not really necessary
-
 class FacebookNoLoop(Topo):
     "Creates a Facebook database configuration 5 interconnected cells"
-    def build(self, n=2):
+    def build(self, n=2, hosts_per_node=2):
         """The baseline facebook topology has 4 core routers and 38 edge
         routers that make up a pod"""
         core_routers = 4
@@ -88,7 +69,6 @@ class FacebookNoLoop(Topo):
         double_link_delay = '.002ms'
         #edge routers are also known as Top of the Rack (TOR) Routers
         switch_type = 'ovsk'
-        hosts_per_node = 2
 
         switches = {}
         hosts = {}
@@ -122,7 +102,7 @@ class FacebookNoLoop(Topo):
 
 class DcellNoLoop(Topo):
     "Creates a Dcell database configuration 5 interconnected cells"
-    def build(self, n=2):
+    def build(self, n=2, hosts_per_node=10):
         start = 0
         num_cells = 5
         top_level_switches = 1
@@ -131,7 +111,6 @@ class DcellNoLoop(Topo):
         link_bandwidth = 10
         link_delay = '.001ms'
         half_link_delay = '.0005ms'
-        total_hosts = 50
         # topology will have four routers(switches) at the top of each cell
         # and then one multi-honed server(host)
 
@@ -143,7 +122,7 @@ class DcellNoLoop(Topo):
         j=0
         for x in range(0, num_cells):
             switches[x] = self.addSwitch('er' + str(x), switch = switch_type)
-            for y in range(0, (total_hosts/num_cells)):
+            for y in range(0, hosts_per_node):
                 hosts[j] = self.addHost('h'+str(j))
                 self.addLink(switches[x], hosts[j], bw=link_bandwidth, delay=link_delay)
                 j = j +1
@@ -183,7 +162,7 @@ class DcellNoLoop(Topo):
 
 class FatTreeTopoNoLoop(Topo):
     "Creates a Fat Tree Topology with 2 core routers, 8 aggregate, 8 edge, and 8 hosts"
-    def build(self, n=2):
+    def build(self, n=2, hosts_per_node=64):
         core = 4
         switch_type = 'ovsbk'
         link_bandwidth = 10
@@ -192,7 +171,6 @@ class FatTreeTopoNoLoop(Topo):
         aggrouters = {}
         edgerouters = {}
         host = {}
-        hosts_per_node = 64
 
         for x in range(0, 2): # Core Switches
             corerouters[x] = self.addSwitch('cr'+str(x), switch = switch_type, stp=1)
@@ -236,126 +214,187 @@ def perfTest():
     run_test = 2 #Set to 1 for IPERF test or 2 for Ping Test
     packetsize = 1472
     #max packet size 1472 since MTU is 1500
-    net = Mininet(topo=topo, controller=RemoteController, link=TCLink, ipBase='192.168.0.0/16')
-
-    net.start()
+    # Traffic pattern from traffic.py, for the ping and iperf tests: bitcomplement, bitreversal,
+    # permutation, stride, hotspot, alltoall, podlocal, crosspod, dcellpeers
+    ping_pattern = 'bitcomplement'
+    pattern_args = {} #e.g. {'k': 1} with 'stride' for the old ring test
+    # Network options from netoptions.py: fastStart, proactive, routed,
+    # multipath, addressPlan, staticArp, ipBase
+    options = netOptions()
+    routing = routingFor(options) #Routing assumed by the iperf prediction
+    # Time and resources per phase, see profiler.py
+    profiler = PhaseProfiler(label=test)
+    link_interval = 0.05 #Seconds between link samples, see linkstats.py
+    qdisc_interval = 1.0 #Seconds between qdisc polls, see qdiscstats.py
+    profiler.phase('build')
+    net, plan = buildNet(topo, options)
+
+    profiler.phase('start')
+    startNet(net, topo, options, plan)
     seconds = 10
     #dumpNodeConnections(net.hosts) #Dumps the connections from each host
-    net.waitConnected()
+    profiler.phase('waitConnected')
+    connectNet(net, topo, options, plan)
 
 
     print "Waiting for network to converge"
-    net.pingAll()
+    profiler.phase('converge')
+    converged = waitConverged(net, topo)
+    print "Converged", converged['converged'], "in %.2f seconds" % converged['seconds']
     host = {}
 
     print "Starting tests"
-    if (test == 'FatTreeTopoNoLoop'):
-        max_host = 512
-        for y in range(0, max_host):
-            host_name = 'h' +str(y)
-            host[y] = net.get(host_name)
-
-    elif (test == 'FacebookNoLoop'):
-        print "*** Running Facebook tests ***"
-        max_host = 48
-        for x in range(0, max_host):
-            host_name = 'h' +str(x)
-            host[x] = net.get(host_name)
-
-    elif (test =='DcellNoLoop'):
-        print "***Running DCellNoLoop tests"
-        max_host = 50
-        for x in range(0, max_host):
-            host_name = 'h' +str(x)
-            print "Adding %s" % host_name
-            host[x] = net.get(host_name)
-
+    profiler.phase('test')
+    max_host = len(topo.hosts())
+    for y in range(0, max_host):
+        host_name = 'h' +str(y)
+        host[y] = net.get(host_name)
+
+    store = ResultStore() #Every run is kept under ./results, see results.py
+    links = LinkSampler(net, interval=link_interval)
+    links.start()
+    queues = QdiscCollector(net, interval=qdisc_interval)
+    queues.start()
     if (run_test == 1):
         print "IPERF Testing"
-        sleep(5)
-
-
-    elif (run_test ==2 and test =='DcellNoLoop'):
-
+        run = store.newRun(test, hosts=max_host, kind='iperf',
+                           pattern=ping_pattern, routing=routing)
+        pairs = uniquePairs(topoPairs(ping_pattern, topo, max_host,
+                                      **pattern_args))
+        results = runIperfFlows(host, pairs, seconds=5)
+        writeFlows(results, run.path('iperf.txt'))
+        print "Flow summary", flowSummary(results)
+        # Max-min fair rates the topology allows, to compare with iperf
+        predicted = predictRates(topo, host, pairs, routing)
+        rows = compareFlows(predicted, results)
+        writeComparison(rows, run.path('iperf_predicted.txt'))
+        print "Flows below their fair share", \
+            len([row for row in rows if row.limit != 'topology'])
+        run.addFlows(results)
+        run.addFlows(predicted, 'predicted_mbps')
+
+
+    elif (run_test ==2):
         print "Ping Testing"
-        outfiles, errfiles = {}, {}
-        bottom = 0
-        for h in range(0, max_host):
-            # Create and/or erase output files
-            outfiles[ host[h] ] = '/tmp/%s.out' % host[h].name
-            errfiles[ host[h] ] = '/tmp/%s.err' % host[h].name
-            host[h].cmd( 'echo >', outfiles[ host[h] ] )
-            host[h].cmd( 'echo >', errfiles[ host[h] ] )
-            # Start pings
-
-            if (h<max_host-1):
-                host[h].cmdPrint('ping', host[h+1].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-            else:
-                host[h].cmdPrint('ping', host[0].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-
-
-        print "Monitoring output for", seconds, "seconds"
-        f = open('output%s.txt' % str(packetsize), 'w')
-        for host[h], line in monitorFiles( outfiles, seconds, timeoutms=500 ):
-            if host[h]:
-                f.write(line)
-
-
-
-        #Still working on killing ping. Run as last test.
-        #for h in range(0, max_host):
-            #host[h].cmd( 'kill %ping')
+        run = store.newRun(test, hosts=max_host, packetsize=packetsize,
+                           kind='ping', pattern=ping_pattern)
+        pairs = topoPairs(ping_pattern, topo, max_host, **pattern_args)
+        stats = pingTest(host, pairs, packetsize, seconds, outdir=run.dir,
+                         sink=run.addPing)
+        stats.write(run.path('output%s.txt' % str(packetsize)))
+
+    links.stop()
+    print "Most utilized links"
+    print links.report()
+    queues.stop()
+    print "Most loaded queues"
+    print queues.report()
+    print "Ending tests"
+    profiler.phase('teardown')
+    teardown(net)
+    profiler.stop()
+    print "Time and peak resources per phase"
+    print profiler.report()
+
+    if (run_test == 1 or run_test == 2):
+        run.add('-', '-', 'convergence_s', converged['seconds'])
+        for phase, phase_seconds in profiler.durations():
+            run.add('-', '-', 'phase_%s_s' % phase, phase_seconds)
+        profiler.write(run.path('profile.json'))
+        links.addTo(run)
+        queues.addTo(run)
+        run.close()
+        print "Results in", run.dir
+    #CLI( net )
 
 
-        sleep(11)
-    elif (run_test ==2 and test !='DcellNoLoop'):
-        print "Ping Testing"
-        outfiles, errfiles = {}, {}
-        for h in range(0, max_host):
-            # Create and/or erase output files
-            outfiles[ host[h] ] = '/tmp/%s.out' % host[h].name
-            errfiles[ host[h] ] = '/tmp/%s.err' % host[h].name
-            host[h].cmd( 'echo >', outfiles[ host[h] ] )
-            host[h].cmd( 'echo >', errfiles[ host[h] ] )
-            # Start pings
-
-            if (h<max_host-1):
-                host[h].cmdPrint('ping', host[h+1].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
+# Topologies the sweep can grow, built for a number of hosts per edge switch
+sweep_topos = {
+    'FatTreeTopoNoLoop': lambda h: FatTreeTopoNoLoop(n=4, hosts_per_node=h),
+    'FacebookNoLoop': lambda h: FacebookNoLoop(n=4, hosts_per_node=h),
+    'DcellNoLoop': lambda h: DcellNoLoop(n=4, hosts_per_node=h),
+    'KaryFatTreeTopo': lambda h: KaryFatTreeTopo(k=4, hostsPerEdge=h)}
+
+def hostSteps(first=1, last=64, factor=2):
+    "Geometric series of hosts per edge switch: first, first*factor, ... last"
+    steps = []
+    h = first
+    while h < last:
+        steps.append(h)
+        h = h * factor
+    steps.append(last)
+    return steps
+
+def sweep(test='FatTreeTopoNoLoop', steps=None, run_test=2, packetsize=1472,
+          seconds=10, ping_pattern='bitcomplement', **options):
+    """Grow the hosts per edge switch and record, for every step, the build
+    and start time, the memory and processes the network added, and the
+    RTT (run_test 2) or iperf throughput (run_test 1)
+    options: network options, e.g. proactive=True or routed=True, see
+    netoptions.py"""
+    options = netOptions(**options)
+    if steps is None:
+        steps = hostSteps()
+    store = ResultStore()
+    columns = ['hosts_per_node', 'hosts', 'build_s', 'start_s', 'converge_s',
+               'mem_mb', 'procs', 'rtt_ms' if run_test == 2 else 'total_mbps']
+    rows = []
+    for hosts_per_node in steps:
+        print "*** Sweep step: %d hosts per edge switch" % hosts_per_node
+        mem_before, procs_before = memoryUsed(), processCount()
+        start = time()
+        topo = sweep_topos[test](hosts_per_node)
+        net, plan = buildNet(topo, options)
+        build_s = time() - start
+        start = time()
+        try:
+            startNet(net, topo, options, plan)
+            start_s = time() - start
+            connectNet(net, topo, options, plan)
+            converged = waitConverged(net, topo)
+            max_host = len(topo.hosts())
+            row = {'hosts_per_node': hosts_per_node, 'hosts': max_host,
+                   'build_s': build_s, 'start_s': start_s,
+                   'converge_s': converged['seconds'],
+                   'mem_mb': (memoryUsed() - mem_before) / 1e6,
+                   'procs': processCount() - procs_before}
+            host = {}
+            for y in range(0, max_host):
+                host[y] = net.get('h' + str(y))
+            run = store.newRun(test, hosts=max_host,
+                               packetsize=packetsize if run_test == 2 else None,
+                               kind='sweep', hosts_per_node=hosts_per_node,
+                               pattern=ping_pattern)
+            if (run_test == 1):
+                pairs = uniquePairs(topoPairs(ping_pattern, topo, max_host))
+                results = runIperfFlows(host, pairs, seconds=5)
+                run.addFlows(results)
+                row['total_mbps'] = flowSummary(results)['totalMbps']
             else:
-                host[h].cmdPrint('ping', host[0].IP(), '-s', packetsize,
-                        '>', outfiles[ host[h] ],
-                        '2>', errfiles[ host[h] ],
-                        '&' )
-
-
-        print "Monitoring output for", seconds, "seconds"
-        f = open('output%s.txt' % str(packetsize), 'w')
-        for host[h], line in monitorFiles( outfiles, seconds, timeoutms=500 ):
-            if host[h]:
-                f.write(line)
-
-
-
-        #Still working on killing ping. Run as last test.
-        #for h in range(0, max_host):
-            #host[h].cmd( 'kill %ping')
-
-
-        sleep(11)
-    print "Ending tests"
-    net.stop()
-    #CLI( net )
+                pairs = topoPairs(ping_pattern, topo, max_host)
+                stats = pingTest(host, pairs, packetsize, seconds,
+                                 outdir=run.dir, sink=run.addPing)
+                row['rtt_ms'] = stats.total().mean
+            for column in columns[2:]:
+                run.add('-', '-', column, row[column])
+            run.close()
+        finally:
+            teardown(net)
+        rows.append(row)
+        print '\t'.join('%s=%s' % (column, row[column]) for column in columns)
+
+    with open('scaling_sweep.txt', 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        for row in rows:
+            f.write('\t'.join(str(row[column]) for column in columns) + '\n')
+    return rows
 
 
 if __name__ == '__main__':
     setLogLevel('info')
-    perfTest()
+    if len(sys.argv) > 1 and sys.argv[1] == 'sweep':
+        # sudo python scaling_hosts.py sweep [topology] [max hosts per edge]
+        sweep(test=sys.argv[2] if len(sys.argv) > 2 else 'FatTreeTopoNoLoop',
+              steps=hostSteps(last=int(sys.argv[3])) if len(sys.argv) > 3 else None)
+    else:
+        perfTest()
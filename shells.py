@@ -0,0 +1,124 @@
+"""
+Author: Brian Lebiednik
+
+Run commands in many node shells at once.
+
+node.cmd() writes a command to the node's shell and blocks until the
+shell prints its prompt again, so looping over 512 hosts costs 512 round
+trips one after the other and the last host starts its traffic seconds
+after the first.  cmdAll() instead sends every command with sendCmd()
+first and then waits for all the shells together, on one poll object
+over their ptys, reading each shell with monitor() only when it has
+output.  All commands start within one pass over the hosts.
+
+    outputs = cmdAll(dict((h, 'ping -c1 10.0.0.1') for h in net.hosts))
+
+Commands ending in '&' come back as soon as the shell has started them.
+The shells read their commands from a pty, which keeps only 4095 bytes
+of a line, so cmdLines() packs many short commands per node into lines
+below MAXLINE and sends them in rounds, one line per node each round.
+"""
+
+import select
+from time import time
+
+from mininet.log import error
+
+MAXLINE = 4000
+TIMEOUT = 30
+
+
+def sendAll(commands):
+    """Send every command to its node's shell without waiting
+       commands: {node: command string or argument list}"""
+    for node, command in commands.items():
+        node.sendCmd(command)
+
+
+def waitAll(nodes, timeout=TIMEOUT):
+    """Wait for the shells of nodes to finish their commands
+       timeout: seconds before a shell still busy is interrupted, None
+       to wait for ever
+       returns: {node: output}"""
+    outputs = dict((node, '') for node in nodes)
+    byFd = {}
+    poller = select.poll()
+    for node in nodes:
+        if node.waiting:
+            fd = node.stdout.fileno()
+            byFd[fd] = node
+            poller.register(fd, select.POLLIN)
+    deadline = None if timeout is None else time() + timeout
+    while byFd:
+        wait = None
+        if deadline is not None:
+            # Checked every pass: a shell that keeps printing never lets
+            # the poll time out
+            wait = int((deadline - time()) * 1000)
+            if wait <= 0:
+                break
+        ready = poller.poll(wait)
+        if not ready:
+            break
+        for fd, event in ready:
+            node = byFd[fd]
+            data = node.monitor(timeoutms=0)
+            outputs[node] += data
+            closed = not data and event & (select.POLLHUP | select.POLLERR)
+            if closed:
+                error('*** %s: shell closed during %s\n' %
+                      (node.name, node.lastCmd))
+            if closed or not node.waiting:
+                poller.unregister(fd)
+                del byFd[fd]
+    for node in byFd.values():
+        error('*** %s: no prompt after %s s, interrupting %s\n' %
+              (node.name, timeout, node.lastCmd))
+        node.sendInt()
+        outputs[node] += node.waitOutput()
+    return outputs
+
+
+def cmdAll(commands, timeout=TIMEOUT):
+    """Run every command in its node's shell, all shells at the same time
+       commands: {node: command string or argument list}
+       returns: {node: output}"""
+    sendAll(commands)
+    return waitAll(list(commands), timeout)
+
+
+def packLines(parts, sep=' ', limit=MAXLINE):
+    """Join parts into as few lines as possible, each shorter than limit
+       bytes, without splitting a part"""
+    lines, line = [], ''
+    for part in parts:
+        if len(part) >= limit:
+            raise ValueError('command of %d bytes does not fit a %d byte '
+                             'shell line: %s...' % (len(part), limit,
+                                                    part[:60]))
+        if line and len(line) + len(sep) + len(part) >= limit:
+            lines.append(line)
+            line = ''
+        line = line + sep + part if line else part
+    if line:
+        lines.append(line)
+    return lines
+
+
+def cmdLines(commands, sep=' ', timeout=TIMEOUT):
+    """Run many commands per node, packed into shell lines by packLines()
+       and sent one line per node and round, all shells at the same time
+       commands: {node: list of commands}, joined with sep; end each
+       one in '&' to run it in the background
+       returns: {node: output of all its lines}"""
+    lines = dict((node, packLines(parts, sep))
+                 for node, parts in commands.items())
+    outputs = dict((node, '') for node in commands)
+    rounds = max([len(nodeLines) for nodeLines in lines.values()] or [0])
+    for i in range(rounds):
+        found = cmdAll(dict((node, nodeLines[i])
+                            for node, nodeLines in lines.items()
+                            if i < len(nodeLines)), timeout)
+        for node, output in found.items():
+            outputs[node] += output
+    return outputs
@@ -0,0 +1,121 @@
+"""
+Author: Brian Lebiednik
+
+Static ARP and MAC pre-learning, so the first packets of a test do not
+pay for address resolution.
+
+At hundreds of hosts the first ping of every pair broadcasts an ARP
+request through every switch and up to the controller, which is why
+pingAll() used to run before measuring.  Once the addresses are set,
+warmStart()
+
+    writes permanent neighbour entries into every namespace with one
+    'ip -batch' each, all namespaces at the same time: on a switched
+    (L2) network every host gets every other host, in the routed mode
+    each end of a link gets the other end
+    adds the shortest path dl_dst rules of proactive.py to the OVS
+    switches with 'ovs-ofctl add-flows', next to the controller's flows,
+    so no packet-in is needed to learn where a MAC is
+
+Run it after net.waitConnected(): POX clears the flow tables of switches
+that connect.  The rules follow one shortest path and do not know about
+STP, so for FatTreeTopo and Facebook use the proactive multipath mode
+instead of learn=True.
+
+    net.waitConnected()
+    warmStart(net, topo)
+"""
+
+from subprocess import PIPE, STDOUT
+
+from mininet.log import info, error
+
+from proactive import shortestPathFlows, addFlows
+
+
+def _l2(node):
+    "OVS and other switches run in the root namespace, routers do not"
+    return not node.inNamespace
+
+
+def neighbourBatches(net):
+    """ip -batch lines with the permanent neighbour entries of every node
+       returns: {node name: list of lines}"""
+    switches = set(switch.name for switch in net.switches if _l2(switch))
+    batches = {}
+    switched = []
+    for host in net.hosts:
+        intf = host.defaultIntf()
+        if intf is None or intf.link is None:
+            continue
+        other = intf.link.intf2 if intf.link.intf1 is intf \
+            else intf.link.intf1
+        if other.node.name in switches:
+            switched.append((host, intf))
+    addrs = [(host, host.IP(), host.MAC()) for host, _intf in switched]
+    for host, intf in switched:
+        batches[host.name] = [
+            'neigh replace %s lladdr %s dev %s nud permanent' %
+            (ip, mac, intf.name)
+            for peer, ip, mac in addrs if peer is not host]
+    for link in net.links:
+        for intf, other in ((link.intf1, link.intf2),
+                            (link.intf2, link.intf1)):
+            if intf.node.name in switches or other.node.name in switches:
+                continue
+            batches.setdefault(intf.node.name, []).append(
+                'neigh replace %s lladdr %s dev %s nud permanent' %
+                (other.ip, other.mac, intf.name))
+    return batches
+
+
+def installNeighbours(net):
+    """Write the permanent neighbour entries of every namespace
+       returns: number of entries written"""
+    batches = neighbourBatches(net)
+    total = sum(len(lines) for lines in batches.values())
+    info('*** Installing %d static ARP entries in %d namespaces\n' %
+         (total, len(batches)))
+    running = []
+    for name in sorted(batches):
+        lines = batches[name]
+        # Permanent entries count against gc_thresh3 (1024 by default)
+        limit = max(1024, 2 * len(lines))
+        script = ('sysctl -qw net.ipv4.neigh.default.gc_thresh2=%d '
+                  'net.ipv4.neigh.default.gc_thresh3=%d; '
+                  'ip -force -batch -' % (limit, limit))
+        proc = net.get(name).popen(['sh', '-c', script], stdin=PIPE,
+                                   stdout=PIPE, stderr=STDOUT)
+        proc.stdin.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        proc.stdin.close()
+        running.append((name, proc))
+    for name, proc in running:
+        output = proc.stdout.read()
+        proc.wait()
+        if proc.returncode:
+            error('*** %s neighbours: %s\n' %
+                  (name, output.decode('utf-8', 'replace').strip()))
+            total -= len(batches[name])
+    return total
+
+
+def preLearn(net, topo, plan=None):
+    """Add the shortest path dl_dst rules to every OVS switch
+       plan: AddressPlan of the hosts, for one rule per pod or edge
+       returns: number of rules added"""
+    flows = shortestPathFlows(net, topo, plan=plan)
+    flows = dict((name, rules) for name, rules in flows.items()
+                 if _l2(net.get(name)))
+    total = sum(len(rules) for rules in flows.values())
+    info('*** Pre-learning %d MAC rules in %d switches\n' %
+         (total, len(flows)))
+    failed = addFlows(flows)
+    return total - sum(len(flows[name]) for name in failed)
+
+
+def warmStart(net, topo, learn=True, plan=None):
+    """Static ARP everywhere and, with learn, MAC rules in the switches
+       returns: (neighbour entries, switch rules)"""
+    entries = installNeighbours(net)
+    rules = preLearn(net, topo, plan) if learn else 0
+    return entries, rules
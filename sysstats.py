@@ -0,0 +1,62 @@
+"""
+Author: Brian Lebiednik
+
+Resource readings from /proc, used to size the emulation server:
+memory in use, processes, CPU load and, per process, resident memory
+and open file descriptors.
+"""
+
+import os
+
+
+def memInfo():
+    "Fields of /proc/meminfo in bytes"
+    info = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 2:
+                scale = 1024 if len(fields) > 2 and fields[2] == 'kB' else 1
+                info[fields[0].rstrip(':')] = int(fields[1]) * scale
+    return info
+
+
+def memoryUsed():
+    "Bytes of memory in use (MemTotal - MemAvailable)"
+    info = memInfo()
+    available = info.get('MemAvailable')
+    if available is None:
+        # Kernels before 3.14
+        available = info['MemFree'] + info.get('Buffers', 0) + \
+            info.get('Cached', 0)
+    return info['MemTotal'] - available
+
+
+def processCount():
+    "Number of processes on the machine"
+    return sum(1 for entry in os.listdir('/proc') if entry.isdigit())
+
+
+def rss(pid='self'):
+    "Resident memory of one process in bytes"
+    with open('/proc/%s/statm' % pid) as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def openFds(pid='self'):
+    "Number of open file descriptors of one process"
+    return len(os.listdir('/proc/%s/fd' % pid))
+
+
+def loadAverage():
+    "1 minute load average"
+    with open('/proc/loadavg') as f:
+        return float(f.read().split()[0])
+
+
+def cpuTimes():
+    "(busy, total) jiffies of all CPUs since boot, from /proc/stat"
+    with open('/proc/stat') as f:
+        fields = [int(value) for value in f.readline().split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return sum(fields) - idle, sum(fields)
@@ -0,0 +1,271 @@
+"""
+Author: Brian Lebiednik
+
+Fast parallel teardown that replaces net.stop() followed by 'mn -c'.
+
+net.stop() stops every switch, link and host one at a time and 'mn -c'
+then searches the whole machine for anything that looks like Mininet.
+teardown() instead takes an Inventory of what this run created (node
+shell pids, OVS bridges and root namespace interfaces), then
+
+    kills every process in a host namespace or a node shell session,
+        which ends all background pings and iperfs and frees the host
+        namespaces together with the veths inside them
+    deletes all bridges and the remaining switch to switch veths with a
+        few batched ovs-vsctl and 'ip -batch' calls running side by side
+    checks that nothing from the inventory is left
+
+After a crash there is no net object; 'sudo python teardown.py' finds
+the leftovers the same way 'mn -c' does and removes them in batches.
+"""
+
+import errno
+import os
+import re
+import signal
+from subprocess import Popen, PIPE, STDOUT
+from time import time, sleep
+
+from mininet.log import info, error, setLogLevel
+from mininet.node import OVSSwitch
+
+
+class Inventory(object):
+    "Node shell pids, OVS bridges and root namespace interfaces of a run"
+
+    def __init__(self, pids=(), bridges=(), intfs=()):
+        self.pids = set(pids)
+        self.bridges = set(bridges)
+        self.intfs = set(intfs)
+
+    def __len__(self):
+        return len(self.pids) + len(self.bridges) + len(self.intfs)
+
+    def __str__(self):
+        return '%d processes, %d bridges, %d interfaces' % (
+            len(self.pids), len(self.bridges), len(self.intfs))
+
+
+def netInventory(net):
+    "Inventory of everything a Mininet object created"
+    pids, bridges, intfs = [], [], []
+    for node in net.hosts + net.switches + net.controllers:
+        if node.shell is not None:
+            pids.append(node.pid)
+    for switch in net.switches:
+        if isinstance(switch, OVSSwitch):
+            bridges.append(switch.name)
+    for link in net.links:
+        for intf in (link.intf1, link.intf2):
+            # Ends inside a host namespace go away with the namespace
+            if not intf.node.inNamespace:
+                intfs.append(intf.name)
+    return Inventory(pids, bridges, intfs)
+
+
+def _run(cmd):
+    "Output of a root namespace command, '' when it is not installed"
+    try:
+        return Popen(cmd, stdout=PIPE, stderr=STDOUT).communicate()[0] \
+            .decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def rootIntfs():
+    "Names of all interfaces in the root namespace"
+    names = set()
+    for line in _run(['ip', '-o', 'link', 'show']).splitlines():
+        fields = line.split(':', 2)
+        if len(fields) == 3:
+            names.add(fields[1].strip().split('@')[0])
+    return names
+
+
+def ovsBridges():
+    return set(_run(['ovs-vsctl', 'list-br']).split())
+
+
+def _alive(pid):
+    "True unless pid is gone or a zombie"
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (IOError, OSError, IndexError):
+        return False
+
+
+def shellPids():
+    "Pids of Mininet node shells ('bash ... mininet:<name>')"
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/%s/cmdline' % entry, 'rb') as f:
+                args = f.read().split(b'\0')
+        except (IOError, OSError):
+            continue
+        if any(arg.startswith(b'mininet:') for arg in args):
+            pids.append(int(entry))
+    return pids
+
+
+def leftoverInventory():
+    "Inventory of Mininet leftovers found on the machine, like 'mn -c'"
+    intfs = [name for name in rootIntfs()
+             if re.search(r'-eth\d+$', name)]
+    return Inventory(shellPids(), ovsBridges(), intfs)
+
+
+def _netns(pid):
+    try:
+        return os.readlink('/proc/%d/ns/net' % pid)
+    except OSError:
+        return None
+
+
+def _session(pid):
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            return int(f.read().rsplit(')', 1)[1].split()[3])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def runProcesses(shells):
+    """Every process in the network namespace or the session of one of
+       the node shells: pings started with '&' in their own job, popen()
+       children and anything else keeping a host namespace alive"""
+    shells = set(shells)
+    rootNs = _netns(os.getpid())
+    namespaces = set(_netns(pid) for pid in shells) - set([rootNs, None])
+    found = set()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if pid in shells or _session(pid) in shells or \
+                _netns(pid) in namespaces:
+            found.add(pid)
+    found.discard(os.getpid())
+    return found
+
+
+def killAll(pids):
+    "SIGKILL every pid"
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                error('*** kill %d: %s\n' % (pid, e))
+
+
+def _chunks(items, size):
+    items = sorted(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def destroy(inventory, chunk=200):
+    """Kill the processes, then delete bridges and interfaces with
+       batched ovs-vsctl and ip calls that run in parallel"""
+    processes = runProcesses(inventory.pids)
+    killAll(processes)
+    # Verify the children as well as the shells
+    inventory.pids |= processes
+    running = []
+    for bridges in _chunks(inventory.bridges, chunk):
+        cmd = ['ovs-vsctl']
+        for bridge in bridges:
+            cmd += ['--', '--if-exists', 'del-br', bridge]
+        running.append((cmd, None))
+    # Host side deaths already took their peers with them
+    intfs = inventory.intfs & rootIntfs()
+    if intfs:
+        lines = ''.join('link del dev %s\n' % name for name in sorted(intfs))
+        running.append((['ip', '-force', '-batch', '-'], lines))
+    procs = []
+    for cmd, stdin in running:
+        try:
+            procs.append(Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=STDOUT))
+        except OSError as e:
+            error('*** %s: %s\n' % (cmd[0], e))
+            continue
+        if stdin is not None:
+            procs[-1].stdin.write(stdin.encode())
+        procs[-1].stdin.close()
+    for proc in procs:
+        proc.wait()
+
+
+def leftovers(inventory):
+    "Part of inventory that still exists"
+    return Inventory([pid for pid in inventory.pids if _alive(pid)],
+                     inventory.bridges & ovsBridges(),
+                     inventory.intfs & rootIntfs())
+
+
+def verify(inventory, timeout=5, interval=0.1):
+    """Wait until nothing from inventory is left; namespaces and their
+       veths are freed by the kernel shortly after the last process exits
+       returns: Inventory of what is still there after timeout"""
+    deadline = time() + timeout
+    left = leftovers(inventory)
+    while len(left) and time() < deadline:
+        sleep(interval)
+        left = leftovers(left)
+    return left
+
+
+def _finish(inventory, start, timeout, fallback):
+    left = verify(inventory, timeout)
+    if len(left):
+        error('*** Not clean after teardown: %s\n' % left)
+        if fallback:
+            error('*** Falling back to mn -c\n')
+            _run(['mn', '-c'])
+            left = leftovers(left)
+    seconds = time() - start
+    info('*** Removed %s in %.2f s\n' % (inventory, seconds))
+    return {'seconds': seconds,
+            'pids': len(inventory.pids),
+            'bridges': len(inventory.bridges),
+            'intfs': len(inventory.intfs),
+            'clean': not len(left),
+            'leftover': str(left)}
+
+
+def teardown(net, timeout=5, fallback=True):
+    """Stop a Mininet network in place of net.stop() and 'mn -c'
+       net: Mininet object, started or not
+       timeout: seconds to wait for the kernel to free everything
+       fallback: run 'mn -c' if something is still left
+       returns: report dict with the counts, seconds and whether the
+       machine is clean"""
+    start = time()
+    info('*** Tearing down the network\n')
+    for controller in net.controllers:
+        controller.stop()
+    inventory = netInventory(net)
+    destroy(inventory)
+    for node in net.hosts + net.switches + net.controllers:
+        # Reap the shells so they do not linger as zombies
+        if node.shell is not None:
+            node.shell.wait()
+            node.cleanup()
+    return _finish(inventory, start, timeout, fallback)
+
+
+def cleanHost(timeout=5):
+    "Remove Mininet leftovers after a crash, in place of 'mn -c'"
+    start = time()
+    inventory = leftoverInventory()
+    info('*** Found %s\n' % inventory)
+    destroy(inventory)
+    return _finish(inventory, start, timeout, False)
+
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    cleanHost()
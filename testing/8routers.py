@@ -1,6 +1,5 @@
 from mininet.topo import Topo
 from mininet.net import Mininet
-from mininet.node import Node
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
 from mininet.link import TCLink
@@ -10,19 +9,9 @@ import time
 import os
 import base64
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-class LinuxRouter( Node ):
-    def config( self, **params ):
-        super( LinuxRouter, self).config( **params )
-
-        self.cmd( 'sysctl net.ipv4.ip_forward=1' )
-        self.cmd( 'sysctl net.ipv4.conf.all.proxy_arp=1' )
-
-
-    def terminate( self ):
-        self.cmd( 'sysctl net.ipv4.ip_forward=0' )
-        self.cmd( 'sysctl net.ipv4.conf.all.proxy_arp=0' )
-        super( LinuxRouter, self ).terminate()
+from routed import LinuxRouter
 
 
 def runNetwork():
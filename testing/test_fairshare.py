@@ -0,0 +1,38 @@
+"""
+Author: Brian Lebiednik
+
+Max-min fair rates from waterFill() on small hand made link sets.
+
+usage: python -m pytest testing/test_fairshare.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fairshare import waterFill
+
+
+class WaterFillTest(unittest.TestCase):
+
+    def testSharedBottleneck(self):
+        # Three flows over one 9 Mbit/s link get 3 each; the third also
+        # crosses a link with room to spare, and the unroutable flow none
+        rates, bottleneck = waterFill([{'l': 1}, {'l': 1}, {'l': 1, 'm': 1},
+                                       None], {'l': 9.0, 'm': 10.0})
+        self.assertEqual(rates, [3.0, 3.0, 3.0, 0.0])
+        self.assertEqual(bottleneck, ['l', 'l', 'l', None])
+
+    def testLeftoverGoesToOthers(self):
+        # The flow held to 2 on b leaves 8 of a to the flow that only
+        # uses a
+        rates, bottleneck = waterFill([{'a': 1, 'b': 1}, {'a': 1}, {'b': 1}],
+                                      {'a': 10.0, 'b': 4.0})
+        self.assertEqual(rates, [2.0, 8.0, 2.0])
+        self.assertEqual(bottleneck, ['b', 'a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Author: Brian Lebiednik
+
+Round trip of topology files through saveSpec() and loadSpec().
+
+usage: python -m pytest testing/test_topofile.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topofile import saveSpec, loadSpec
+from topogen import TopoSpec
+
+
+class SaveLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix='topofile-')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def roundTrip(self, spec):
+        path = os.path.join(self.dir, 'test.topo')
+        saveSpec(spec, path)
+        return loadSpec(path)
+
+    def testSpacesInValues(self):
+        spec = TopoSpec('spaces', note='two words')
+        spec.addNodes(['s1'], switch=True, pods=[0])
+        spec.addNodes(['h1', 'h2'], pods=[0, 0])
+        spec.addLinks([1, 2], [0, 0], bw=10, delay='1ms',
+                      opts='-s 1 -c 2')
+        spec.hostOpts = {'inNamespace': True, 'cmd': 'ping -i 0.2'}
+        spec.nodeOpts[1] = {'ip': '10.0.0.1/8', 'label': ' padded '}
+        loaded = self.roundTrip(spec)
+        self.assertEqual(loaded.params, spec.params)
+        self.assertEqual(loaded.linkOpts, spec.linkOpts)
+        self.assertEqual(loaded.hostOpts, spec.hostOpts)
+        self.assertEqual(loaded.nodeOpts, spec.nodeOpts)
+        self.assertEqual(loaded.names, spec.names)
+        self.assertEqual(list(loaded.src), list(spec.src))
+        self.assertEqual(list(loaded.dst), list(spec.dst))
+
+    def testTypesKept(self):
+        spec = TopoSpec('types', a=1, b=1.5, c=True, d='10', e='', f='x')
+        spec.addNodes(['s1'], switch=True)
+        self.assertEqual(self.roundTrip(spec).params, spec.params)
+
+    def testQuoteWithSpaceRejected(self):
+        spec = TopoSpec('quotes', opts='say "hi" there')
+        spec.addNodes(['s1'], switch=True)
+        self.assertRaises(ValueError, self.roundTrip, spec)
+
+
+if __name__ == '__main__':
+    unittest.main()
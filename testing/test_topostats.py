@@ -0,0 +1,41 @@
+"""
+Author: Brian Lebiednik
+
+Graph metrics of a k=4 fat tree against the counts worked out by hand.
+
+usage: python -m pytest testing/test_topostats.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topogen import fatTreeSpec
+from topostats import topoStats
+
+
+class FatTreeStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = topoStats(fatTreeSpec(k=4))
+
+    def testSize(self):
+        self.assertEqual(self.stats['hosts'], 16)
+        self.assertEqual(self.stats['switches'], 20)
+
+    def testHops(self):
+        # Ordered host pairs: 1 other host under the same edge switch,
+        # 2 under the other edge of the pod and 12 in the other pods
+        self.assertEqual(self.stats['hops'], {2: 16, 4: 32, 6: 192})
+        self.assertEqual(self.stats['diameter'], 6)
+        self.assertEqual(self.stats['unreachable'], 0)
+
+    def testBisection(self):
+        # Full bisection bandwidth: half of the 16 hosts
+        self.assertEqual(self.stats['bisection'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+Author: Brian Lebiednik
+
+Traffic patterns against the host pairs the scripts used to list by
+hand.
+
+usage: python -m pytest testing/test_traffic.py
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from traffic import dcellPeers, trafficPairs
+
+
+class DcellPeersTest(unittest.TestCase):
+
+    # The iperf pairs perfTest() started one by one for the 25 host DCell
+    oldPairs = [(0, 5), (1, 10), (2, 15), (3, 20), (6, 11), (7, 16),
+                (8, 21), (12, 17), (13, 22), (18, 23)]
+
+    def testOldPairs(self):
+        self.assertEqual(dcellPeers(25), self.oldPairs)
+
+    def testByName(self):
+        self.assertEqual(trafficPairs('dcellpeers', 25), self.oldPairs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+"""
+Author: Brian Lebiednik
+
+Declarative topology files and a binary topology cache.
+
+A topology file lists the nodes and links of a TopoSpec, one per line:
+
+    # comments start with a hash
+    topo fattree k=4 hostsPerEdge=1
+    switchopts stp=1
+    hostopts
+    class 0 bw=10 delay=.001ms
+    switch cr0 -1
+    host h0 0 ip=10.0.0.1/8
+    link cr0 ar0 0
+
+    switch/host <name> <pod> [key=value ...]
+    link <node1> <node2> [class]   (class defaults to 0)
+    class <index> [key=value ...]  link options shared by many links
+
+Values are read back as int, float, True/False or string; a quoted
+value ("10") stays a string, and quotes keep a value with spaces in one
+token (opts="-s 1").  Any Topo can be exported with
+specFromTopo() and saveSpec(), and a file is turned back into a Topo
+with SpecTopo, which also works from the mn command line:
+
+    sudo mn --custom topofile.py --topo spec,mytopo.topo
+
+cachedSpec() runs a generator from topogen once per set of parameters
+and keeps the result as a marshal file, so repeated runs of large
+generated topologies load the tables instead of rebuilding them.
+"""
+
+import hashlib
+import marshal
+import os
+import re
+import tempfile
+from array import array
+
+from mininet.topo import Topo
+
+from topogen import TopoSpec, fatTreeSpec, dcellSpec, facebookSpec
+
+generators = {'fattree': fatTreeSpec,
+              'dcell': dcellSpec,
+              'facebook': facebookSpec}
+
+CACHE_VERSION = 1
+cacheDir = os.environ.get('TOPO_CACHE',
+                          os.path.join(tempfile.gettempdir(), 'topocache'))
+
+# Keys that mininet adds to node and link info; they are not options
+_nodeKeys = ('isSwitch',)
+_linkKeys = ('node1', 'node2', 'port1', 'port2')
+
+# Whitespace separated tokens, a quoted part may contain spaces
+_tokens = re.compile(r'(?:"[^"]*"|[^\s"]|")+')
+
+
+def _value(text):
+    "Parse an option value as int, float, bool or string"
+    if len(text) > 1 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    if text in ('True', 'False'):
+        return text == 'True'
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _options(tokens):
+    "Parse key=value tokens into a dict"
+    opts = {}
+    for token in tokens:
+        key, _sep, value = token.partition('=')
+        opts[key] = _value(value)
+    return opts
+
+
+def _token(value):
+    "Format a value so that _value() reads back the same type"
+    text = str(value)
+    if isinstance(value, str) and (_value(text) != value or
+                                   re.search(r'\s', text)):
+        if '"' in text or '\n' in text:
+            raise ValueError('value %r cannot be quoted on one line' % text)
+        return '"%s"' % text
+    return text
+
+
+def _format(opts):
+    "Format a dict as sorted key=value tokens"
+    return ' '.join('%s=%s' % (key, _token(opts[key]))
+                    for key in sorted(opts))
+
+
+def saveSpec(spec, path):
+    "Write a TopoSpec as a topology file"
+    names, pod, nodeOpts = spec.names, spec.pod, spec.nodeOpts
+    lines = ['topo %s %s' % (spec.name, _format(spec.params)),
+             'switchopts %s' % _format(spec.switchOpts),
+             'hostopts %s' % _format(spec.hostOpts)]
+    lines.extend('class %d %s' % (i, _format(opts))
+                 for i, opts in enumerate(spec.linkOpts))
+    for i, name in enumerate(names):
+        lines.append('%s %s %d %s' % ('switch' if spec.switch[i] else 'host',
+                                      name, pod[i],
+                                      _format(nodeOpts.get(i, {}))))
+    src, dst, cls = spec.src, spec.dst, spec.cls
+    lines.extend('link %s %s %d' % (names[src[i]], names[dst[i]], cls[i])
+                 for i in range(len(src)))
+    with open(path, 'w') as f:
+        f.write('\n'.join(line.rstrip() for line in lines) + '\n')
+
+
+def loadSpec(path):
+    "Read a topology file into a TopoSpec in one pass"
+    spec = TopoSpec(os.path.basename(path))
+    index = {}
+    names, switch, pod = spec.names, spec.switch, spec.pod
+    src, dst, cls = spec.src, spec.dst, spec.cls
+    classes = {}
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            tokens = _tokens.findall(line)
+            if not tokens or tokens[0].startswith('#'):
+                continue
+            kind = tokens[0]
+            try:
+                if kind == 'link':
+                    src.append(index[tokens[1]])
+                    dst.append(index[tokens[2]])
+                    cls.append(int(tokens[3]) if len(tokens) > 3 else 0)
+                elif kind == 'switch' or kind == 'host':
+                    index[tokens[1]] = len(names)
+                    if len(tokens) > 3:
+                        spec.nodeOpts[len(names)] = _options(tokens[3:])
+                    names.append(tokens[1])
+                    switch.append(1 if kind == 'switch' else 0)
+                    pod.append(int(tokens[2]) if len(tokens) > 2 else -1)
+                elif kind == 'class':
+                    classes[int(tokens[1])] = _options(tokens[2:])
+                elif kind == 'switchopts':
+                    spec.switchOpts = _options(tokens[1:])
+                elif kind == 'hostopts':
+                    spec.hostOpts = _options(tokens[1:])
+                elif kind == 'topo':
+                    spec.name = tokens[1]
+                    spec.params = _options(tokens[2:])
+                else:
+                    raise ValueError('unknown keyword %s' % kind)
+            except (IndexError, KeyError, ValueError) as e:
+                raise ValueError('%s:%d: bad line %r (%s)' %
+                                 (path, lineno, line.strip(), e))
+    spec.linkOpts = [classes.get(i, {}) for i in range(max(classes) + 1)] \
+        if classes else [{}]
+    return spec
+
+
+def specFromTopo(topo, name=None):
+    """Export any mininet Topo as a TopoSpec.
+       Options shared by all switches (or all hosts) become switchOpts
+       (hostOpts); the rest are kept per node."""
+    spec = TopoSpec(name or topo.__class__.__name__)
+    index = {}
+    infos = []
+    for node in topo.nodes(sort=False):
+        info = dict(topo.nodeInfo(node))
+        isSwitch = topo.isSwitch(node)
+        for key in _nodeKeys:
+            info.pop(key, None)
+        index[node] = len(spec.names)
+        spec.addNodes([node], switch=isSwitch)
+        infos.append(info)
+    for isSwitch, attr in ((1, 'switchOpts'), (0, 'hostOpts')):
+        group = [info for i, info in enumerate(infos)
+                 if spec.switch[i] == isSwitch]
+        if group:
+            shared = dict((key, value) for key, value in group[0].items()
+                          if all(info.get(key) == value for info in group))
+            setattr(spec, attr, shared)
+    for i, info in enumerate(infos):
+        shared = spec.switchOpts if spec.switch[i] else spec.hostOpts
+        own = dict((key, value) for key, value in info.items()
+                   if key not in shared)
+        if own:
+            spec.nodeOpts[i] = own
+    for node1, node2, info in topo.links(sort=False, withInfo=True):
+        opts = dict((key, value) for key, value in info.items()
+                    if key not in _linkKeys)
+        spec.addLinks([index[node1]], [index[node2]], **opts)
+    return spec
+
+
+def _tobytes(a):
+    return a.tobytes() if hasattr(a, 'tobytes') else a.tostring()
+
+
+def _frombytes(typecode, data):
+    a = array(typecode)
+    if hasattr(a, 'frombytes'):
+        a.frombytes(data)
+    else:
+        a.fromstring(data)
+    return a
+
+
+def dumpSpec(spec, path):
+    "Write a TopoSpec as a marshal cache file"
+    record = (CACHE_VERSION, spec.name, spec.params, spec.names,
+              _tobytes(spec.switch), _tobytes(spec.pod), _tobytes(spec.src),
+              _tobytes(spec.dst), _tobytes(spec.cls), spec.linkOpts,
+              spec.switchOpts, spec.hostOpts, spec.nodeOpts)
+    tmp = '%s.%d' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        marshal.dump(record, f)
+    os.rename(tmp, path)
+
+
+def undumpSpec(path):
+    "Read a marshal cache file back into a TopoSpec"
+    with open(path, 'rb') as f:
+        record = marshal.load(f)
+    if record[0] != CACHE_VERSION:
+        raise ValueError('%s: cache version %s' % (path, record[0]))
+    spec = TopoSpec(record[1], **record[2])
+    spec.names = record[3]
+    spec.switch = _frombytes('B', record[4])
+    spec.pod = _frombytes('i', record[5])
+    spec.src = _frombytes('i', record[6])
+    spec.dst = _frombytes('i', record[7])
+    spec.cls = _frombytes('H', record[8])
+    (spec.linkOpts, spec.switchOpts,
+     spec.hostOpts, spec.nodeOpts) = record[9:13]
+    return spec
+
+
+def _canonical(value):
+    "Parameters with every dict replaced by its sorted items"
+    if isinstance(value, dict):
+        return sorted((key, _canonical(item)) for key, item in value.items())
+    return value
+
+
+def cacheKey(generator, params):
+    "Cache file name for a generator and its parameters"
+    text = repr((CACHE_VERSION, generator, _canonical(params)))
+    return '%s-%s.spec' % (generator,
+                           hashlib.sha1(text.encode('utf-8')).hexdigest()[:16])
+
+
+def cachedSpec(generator, **params):
+    """Return generators[generator](**params), loading it from the cache
+       when the same parameters were generated before"""
+    path = os.path.join(cacheDir, cacheKey(generator, params))
+    if os.path.exists(path):
+        try:
+            return undumpSpec(path)
+        except (EOFError, ValueError, TypeError):
+            pass
+    spec = generators[generator](**params)
+    if not os.path.isdir(cacheDir):
+        os.makedirs(cacheDir)
+    dumpSpec(spec, path)
+    return spec
+
+
+class SpecTopo(Topo):
+    "Topology built from a topology file or a TopoSpec"
+    def build(self, spec):
+        if not isinstance(spec, TopoSpec):
+            spec = loadSpec(spec)
+        spec.addTo(self)
+
+
+topos = {'spec': SpecTopo}
@@ -0,0 +1,304 @@
+"""
+Author: Brian Lebiednik
+
+Parameterized topology generators.
+
+Each generator returns a TopoSpec: a compact description of the
+topology made of a node name list and parallel index arrays for the
+links.  The link tables are computed arithmetically in one pass, so
+even large instances (k=32 fat tree, 8192 hosts) are described in a few
+milliseconds.  A TopoSpec can then be added to any mininet Topo.
+
+Usage
+    topo = KaryFatTreeTopo(k=8, hostsPerEdge=4)
+    net = Mininet(topo=topo, controller=RemoteController, link=TCLink)
+
+or, from the mn command line
+    sudo mn --custom topogen.py --topo fattree,8
+    sudo mn --custom topogen.py --topo dcell,4,2
+    sudo mn --custom topogen.py --topo facebook,4
+"""
+
+from array import array
+
+from mininet.topo import Topo
+
+
+class TopoSpec(object):
+    """Compact node and link tables describing a topology.
+       Nodes are numbered in the order they are added.  Links are kept
+       as parallel arrays (src, dst, cls) where cls indexes a small
+       table of link option dicts shared by many links.  switchOpts and
+       hostOpts apply to every switch or host; nodeOpts maps a node
+       index to the few options that are specific to it."""
+
+    def __init__(self, name, **params):
+        self.name = name
+        self.params = params
+        self.names = []
+        self.switch = array('B')
+        self.pod = array('i')
+        self.src = array('i')
+        self.dst = array('i')
+        self.cls = array('H')
+        self.linkOpts = []
+        self.switchOpts = {}
+        self.hostOpts = {}
+        self.nodeOpts = {}
+
+    def numNodes(self):
+        return len(self.names)
+
+    def numLinks(self):
+        return len(self.src)
+
+    def hosts(self):
+        "Indexes of all hosts"
+        return [i for i, s in enumerate(self.switch) if not s]
+
+    def switches(self):
+        "Indexes of all switches"
+        return [i for i, s in enumerate(self.switch) if s]
+
+    def addNodes(self, names, switch=False, pods=None):
+        """Append nodes in bulk
+           names: list of node names
+           switch: True for switches, False for hosts
+           pods: optional list with the pod of each node
+           returns: index of the first node added"""
+        first = len(self.names)
+        self.names.extend(names)
+        count = len(self.names) - first
+        self.switch.extend(array('B', [1 if switch else 0]) * count)
+        if pods is None:
+            self.pod.extend(array('i', [-1]) * count)
+        else:
+            self.pod.extend(pods)
+        return first
+
+    def linkClass(self, opts):
+        "Index of the link option dict equal to opts, added if new"
+        for i, known in enumerate(self.linkOpts):
+            if known == opts:
+                return i
+        self.linkOpts.append(dict(opts))
+        return len(self.linkOpts) - 1
+
+    def addLinks(self, src, dst, **opts):
+        """Append links src[i] <-> dst[i] in bulk, all sharing opts
+           src, dst: sequences of node indexes"""
+        if len(src) != len(dst):
+            raise ValueError('src and dst must have the same length')
+        self.src.extend(src)
+        self.dst.extend(dst)
+        self.cls.extend(array('H', [self.linkClass(opts)]) * len(src))
+
+    def addTo(self, topo):
+        """Add every node and link to a mininet Topo.
+           Switches get an explicit dpid so that names such as cr0,
+           ar0 and er0 do not collide on the default dpid."""
+        names, switch, nodeOpts = self.names, self.switch, self.nodeOpts
+        for i, name in enumerate(names):
+            if switch[i]:
+                params = dict(self.switchOpts, dpid='%x' % (i + 1))
+                params.update(nodeOpts.get(i, {}))
+                topo.addSwitch(name, **params)
+            else:
+                params = dict(self.hostOpts)
+                params.update(nodeOpts.get(i, {}))
+                topo.addHost(name, **params)
+        src, dst, cls, opts = self.src, self.dst, self.cls, self.linkOpts
+        for i in range(len(src)):
+            topo.addLink(names[src[i]], names[dst[i]], **opts[cls[i]])
+        topo.spec = self
+        return topo
+
+
+def fatTreeSpec(k=4, hostsPerEdge=None, oversub=1, bw=10,
+                delay='.001ms', switchOpts=None):
+    """k-ary fat tree
+       k: number of pods (even); each pod has k/2 edge and k/2
+          aggregate switches, and there are (k/2)^2 core switches
+       hostsPerEdge: hosts per edge switch (default k/2 * oversub)
+       oversub: edge oversubscription ratio used for the default host count
+       bw, delay: link parameters for every link
+       Aggregate switch j of every pod connects to cores j*k/2 .. j*k/2+k/2-1,
+       so k=4 reproduces the cr/ar/er wiring of WorkingFatTree.py."""
+    if k < 2 or k % 2:
+        raise ValueError('fat tree k must be an even number >= 2')
+    half = k // 2
+    if hostsPerEdge is None:
+        hostsPerEdge = int(half * oversub)
+    num_core = half * half
+    num_agg = num_edge = k * half
+    num_hosts = num_edge * hostsPerEdge
+
+    spec = TopoSpec('fattree', k=k, hostsPerEdge=hostsPerEdge, bw=bw,
+                    delay=delay)
+    spec.switchOpts = dict(switchOpts or {})
+    core = spec.addNodes(['cr%d' % c for c in range(num_core)], switch=True)
+    agg = spec.addNodes(['ar%d' % a for a in range(num_agg)], switch=True,
+                        pods=[a // half for a in range(num_agg)])
+    edge = spec.addNodes(['er%d' % e for e in range(num_edge)], switch=True,
+                         pods=[e // half for e in range(num_edge)])
+    host = spec.addNodes(['h%d' % h for h in range(num_hosts)],
+                         pods=[h // hostsPerEdge // half
+                               for h in range(num_hosts)])
+
+    # Core to aggregate
+    spec.addLinks([core + (a % half) * half + m
+                   for a in range(num_agg) for m in range(half)],
+                  [agg + a for a in range(num_agg) for m in range(half)],
+                  bw=bw, delay=delay)
+    # Aggregate to edge, a full mesh inside every pod
+    spec.addLinks([agg + (e // half) * half + j
+                   for e in range(num_edge) for j in range(half)],
+                  [edge + e for e in range(num_edge) for j in range(half)],
+                  bw=bw, delay=delay)
+    # Edge to host
+    spec.addLinks([edge + h // hostsPerEdge for h in range(num_hosts)],
+                  [host + h for h in range(num_hosts)],
+                  bw=bw, delay=delay)
+    return spec
+
+
+class KaryFatTreeTopo(Topo):
+    "k-ary fat tree with (k/2)^2 core switches and k pods"
+    def build(self, k=4, hostsPerEdge=None, oversub=1, **opts):
+        fatTreeSpec(k, hostsPerEdge, oversub, **opts).addTo(self)
+
+
+def dcellSize(n, k):
+    """Number of servers in every DCell level up to k
+       returns: [t0, t1, ... tk] where t0 = n and t(l) = t(l-1) * (t(l-1) + 1)"""
+    sizes = [n]
+    for _level in range(k):
+        sizes.append(sizes[-1] * (sizes[-1] + 1))
+    return sizes
+
+
+def dcellSpec(n=4, k=1, hostsPerServer=1, bw=10, delay='.001ms',
+              switchOpts=None):
+    """Recursive DCell_k built from DCell_0 cells of n servers
+       Every server is a switch sw<cell>_<i> with hostsPerServer hosts,
+       every DCell_0 has a mini switch er<cell> wired to its n servers.
+       At each level l, DCell_l is t(l-1)+1 copies of DCell_(l-1) and
+       for sub-cells i < j server [i, j-1] is linked to server [j, i];
+       the links are computed arithmetically, one pass per level.
+       n=4, k=1 gives the 5 cell shape of Dcell in performancetest.py."""
+    if n < 2 or k < 0:
+        raise ValueError('DCell needs n >= 2 and k >= 0')
+    sizes = dcellSize(n, k)
+    num_servers = sizes[k]
+    num_cells = num_servers // n
+    top = sizes[k - 1] if k else num_servers
+    num_hosts = num_servers * hostsPerServer
+
+    spec = TopoSpec('dcell', n=n, k=k, hostsPerServer=hostsPerServer,
+                    bw=bw, delay=delay)
+    spec.switchOpts = dict(switchOpts or {})
+    mini = spec.addNodes(['er%d' % c for c in range(num_cells)],
+                         switch=True,
+                         pods=[c * n // top for c in range(num_cells)])
+    server = spec.addNodes(['sw%d_%d' % (u // n, u % n)
+                            for u in range(num_servers)], switch=True,
+                           pods=[u // top for u in range(num_servers)])
+    host = spec.addNodes(['h%d' % h for h in range(num_hosts)],
+                         pods=[h // hostsPerServer // top
+                               for h in range(num_hosts)])
+
+    # DCell_0: every server to the mini switch of its cell
+    spec.addLinks([mini + u // n for u in range(num_servers)],
+                  [server + u for u in range(num_servers)],
+                  bw=bw, delay=delay)
+    # DCell_l: [i, j-1] <-> [j, i] inside each DCell_l block
+    for level in range(1, k + 1):
+        sub, size = sizes[level - 1], sizes[level]
+        groups = sub + 1
+        blocks = range(0, num_servers, size)
+        spec.addLinks([server + b + i * sub + j - 1 for b in blocks
+                       for j in range(1, groups) for i in range(j)],
+                      [server + b + j * sub + i for b in blocks
+                       for j in range(1, groups) for i in range(j)],
+                      bw=bw, delay=delay)
+    # Server to host
+    spec.addLinks([server + h // hostsPerServer for h in range(num_hosts)],
+                  [host + h for h in range(num_hosts)],
+                  bw=bw, delay=delay)
+    return spec
+
+
+class RecursiveDcellTopo(Topo):
+    "DCell_k of DCell_0 cells with n servers each"
+    def build(self, n=4, k=1, hostsPerServer=1, **opts):
+        dcellSpec(n, k, hostsPerServer, **opts).addTo(self)
+
+
+def facebookSpec(pods=2, planes=4, torsPerPod=48, spinesPerPlane=4,
+                 uplinksPerPlane=1, hostsPerTor=1, bw=10, delay='.001ms',
+                 switchOpts=None):
+    """Multi-pod Facebook data center fabric
+       pods: number of server pods
+       planes: spine planes, which is also the fabric switches per pod
+       torsPerPod: TOR switches in every pod
+       spinesPerPlane: spine switches in every plane
+       uplinksPerPlane: parallel links from a TOR to its fabric switch
+                        in each plane
+       hostsPerTor: hosts on every TOR
+       Fabric switch j of every pod connects to all spines of plane j,
+       and every TOR connects to all fabric switches of its pod.  With
+       pods=1 and planes=4 this is the single pod of Facebook."""
+    if min(pods, planes, torsPerPod, spinesPerPlane, uplinksPerPlane) < 1:
+        raise ValueError('Facebook fabric sizes must be >= 1')
+    num_spine = planes * spinesPerPlane
+    num_fabric = pods * planes
+    num_tor = pods * torsPerPod
+    num_hosts = num_tor * hostsPerTor
+
+    spec = TopoSpec('facebook', pods=pods, planes=planes,
+                    torsPerPod=torsPerPod, spinesPerPlane=spinesPerPlane,
+                    uplinksPerPlane=uplinksPerPlane, hostsPerTor=hostsPerTor,
+                    bw=bw, delay=delay)
+    spec.switchOpts = dict(switchOpts or {})
+    spine = spec.addNodes(['sp%d_%d' % (s // spinesPerPlane,
+                                        s % spinesPerPlane)
+                           for s in range(num_spine)], switch=True)
+    fabric = spec.addNodes(['fs%d_%d' % (f // planes, f % planes)
+                            for f in range(num_fabric)], switch=True,
+                           pods=[f // planes for f in range(num_fabric)])
+    tor = spec.addNodes(['er%d' % t for t in range(num_tor)], switch=True,
+                        pods=[t // torsPerPod for t in range(num_tor)])
+    host = spec.addNodes(['h%d' % h for h in range(num_hosts)],
+                         pods=[h // hostsPerTor // torsPerPod
+                               for h in range(num_hosts)])
+
+    # Spine planes: fabric switch j of every pod to each spine of plane j
+    spec.addLinks([spine + (f % planes) * spinesPerPlane + s
+                   for f in range(num_fabric)
+                   for s in range(spinesPerPlane)],
+                  [fabric + f for f in range(num_fabric)
+                   for s in range(spinesPerPlane)],
+                  bw=bw, delay=delay)
+    # Pods: every TOR to each fabric switch of its pod
+    spec.addLinks([fabric + (t // torsPerPod) * planes + j
+                   for t in range(num_tor) for j in range(planes)
+                   for u in range(uplinksPerPlane)],
+                  [tor + t for t in range(num_tor) for j in range(planes)
+                   for u in range(uplinksPerPlane)],
+                  bw=bw, delay=delay)
+    # TOR to host
+    spec.addLinks([tor + h // hostsPerTor for h in range(num_hosts)],
+                  [host + h for h in range(num_hosts)],
+                  bw=bw, delay=delay)
+    return spec
+
+
+class FacebookFabricTopo(Topo):
+    "Facebook fabric of pods joined by spine planes"
+    def build(self, pods=2, planes=4, torsPerPod=48, **opts):
+        facebookSpec(pods, planes, torsPerPod, **opts).addTo(self)
+
+
+topos = {'fattree': KaryFatTreeTopo,
+         'dcell': RecursiveDcellTopo,
+         'facebook': FacebookFabricTopo}
@@ -0,0 +1,161 @@
+"""
+Author: Brian Lebiednik
+
+Synthetic traffic patterns.
+
+Every pattern takes the number of hosts n and returns a list of
+(src, dst) host indexes, where index i is host 'h<i>'.  The same pairs
+drive the ping test and the iperf test in perfTest().
+
+    bitcomplement  i -> ~i (n - 1 - i when n is not a power of two)
+    bitreversal    i -> i with its bits reversed (n a power of two)
+    permutation    random permutation without fixed points (seed)
+    stride         i -> i + k mod n (k=1 is the old ring test)
+    hotspot        every host -> one of the hot hosts (hot=[0])
+    alltoall       every ordered pair
+    podlocal       i -> next host of the same pod (pods)
+    crosspod       i -> host at the same position in the next pod (pods)
+    dcellpeers     [c, i] <-> [i + 1, c], the DCell_1 level links
+                   (perCell, cells); 5x5 is the old DCell iperf test
+"""
+
+import random
+
+
+def _bits(n):
+    "Number of bits needed to number n hosts"
+    return max(1, (n - 1).bit_length())
+
+
+def bitComplement(n):
+    if n & (n - 1) == 0:
+        mask = n - 1
+        return [(i, ~i & mask) for i in range(n)]
+    return [(i, n - 1 - i) for i in range(n) if i != n - 1 - i]
+
+
+def bitReversal(n):
+    if n & (n - 1):
+        raise ValueError('bit reversal needs a power of two hosts, not %d'
+                         % n)
+    bits = _bits(n)
+    pairs = []
+    for i in range(n):
+        dst = int(format(i, '0%db' % bits)[::-1], 2)
+        if dst != i:
+            pairs.append((i, dst))
+    return pairs
+
+
+def permutation(n, seed=None):
+    "Random permutation where no host sends to itself"
+    rng = random.Random(seed)
+    dst = list(range(n))
+    rng.shuffle(dst)
+    for i in range(n):
+        if dst[i] == i:
+            j = (i + 1) % n
+            dst[i], dst[j] = dst[j], dst[i]
+    return [(i, dst[i]) for i in range(n) if dst[i] != i]
+
+
+def stride(n, k=1):
+    return [(i, (i + k) % n) for i in range(n) if (i + k) % n != i]
+
+
+def hotspot(n, hot=(0,)):
+    hot = list(hot)
+    return [(i, hot[i % len(hot)]) for i in range(n) if i not in hot]
+
+
+def allToAll(n):
+    return [(i, j) for i in range(n) for j in range(n) if i != j]
+
+
+def _byPod(n, pods):
+    if pods is None or len(pods) < n:
+        raise ValueError('pod local and cross pod patterns need the pod '
+                         'of every host')
+    members = {}
+    for i in range(n):
+        members.setdefault(pods[i], []).append(i)
+    return [members[p] for p in sorted(members)]
+
+
+def podLocal(n, pods=None):
+    pairs = []
+    for members in _byPod(n, pods):
+        size = len(members)
+        pairs.extend((members[i], members[(i + 1) % size])
+                     for i in range(size) if size > 1)
+    return pairs
+
+
+def crossPod(n, pods=None):
+    groups = _byPod(n, pods)
+    pairs = []
+    for g, members in enumerate(groups):
+        other = groups[(g + 1) % len(groups)]
+        if other is not members:
+            pairs.extend((src, other[i % len(other)])
+                         for i, src in enumerate(members))
+    return pairs
+
+
+def dcellPeers(n, perCell=None, cells=None):
+    """Host [c, i] is h<c * perCell + i>; by default the n hosts are
+       taken as a square of cells"""
+    if perCell is None:
+        perCell = int(round(n ** 0.5))
+    if cells is None:
+        cells = n // perCell
+    return [(c * perCell + i, (i + 1) * perCell + c)
+            for c in range(min(cells, perCell))
+            for i in range(c, perCell) if i + 1 < cells]
+
+
+patterns = {'bitcomplement': bitComplement,
+            'bitreversal': bitReversal,
+            'permutation': permutation,
+            'stride': stride,
+            'hotspot': hotspot,
+            'alltoall': allToAll,
+            'podlocal': podLocal,
+            'crosspod': crossPod,
+            'dcellpeers': dcellPeers}
+
+
+def trafficPairs(pattern, n, **params):
+    "Pairs of host indexes for a named pattern"
+    if pattern not in patterns:
+        raise ValueError('unknown traffic pattern %s, try one of %s' %
+                         (pattern, ', '.join(sorted(patterns))))
+    return patterns[pattern](n, **params)
+
+
+def hostPods(topo, n=None):
+    "Pod of hosts h0..h<n-1> for a topology built from a TopoSpec"
+    spec = getattr(topo, 'spec', None)
+    if spec is None:
+        return None
+    index = dict((name, i) for i, name in enumerate(spec.names))
+    n = len(spec.hosts()) if n is None else n
+    return [spec.pod[index['h%d' % i]] for i in range(n)]
+
+
+def topoPairs(pattern, topo, n, **params):
+    "trafficPairs() that takes the host pods from topo when needed"
+    if pattern in ('podlocal', 'crosspod') and 'pods' not in params:
+        params['pods'] = hostPods(topo, n)
+    return trafficPairs(pattern, n, **params)
+
+
+def uniquePairs(pairs):
+    "Drop (b, a) when (a, b) is already in pairs, keeping the order"
+    seen = set()
+    unique = []
+    for src, dst in pairs:
+        if (dst, src) not in seen:
+            seen.add((src, dst))
+            unique.append((src, dst))
+    return unique